@@ -4,12 +4,56 @@ Demo: SceneParser + TTSGenerator Integration
 Demonstrates parsing a text script and generating audio for each scene
 """
 
+import asyncio
+import sys
 import yaml
 from pathlib import Path
-from modules.scene_parser import SceneParser
+from typing import List, Optional, Tuple
+from modules.music_selector import MusicSelector
+from modules.scene_parser import Scene, SceneParser
 from modules.tts_generator import TTSGenerator
 
 
+def _tts_available() -> bool:
+    """Import the TTS library (slow: pulls in torch) and report availability"""
+    try:
+        from TTS.api import TTS
+        return True
+    except ImportError:
+        return False
+
+
+def _select_music(config: dict) -> Optional[str]:
+    """Pick a background track (the demo never mixes, so it is not decoded)"""
+    try:
+        return MusicSelector(config).select_music()
+    except (FileNotFoundError, RuntimeError):
+        return None
+
+
+def _format_scenes(scenes: List[Scene], show_text: bool) -> str:
+    """Format the scene listing as one block of text"""
+    lines = []
+    for scene in scenes:
+        lines.append(f"Scene {scene.id}:")
+        if show_text:
+            text = f"{scene.text[:50]}..." if len(scene.text) > 50 else scene.text
+            lines.append(f"  Text: {text}")
+        lines.append(f"  Audio: {scene.audio_path or 'Not generated yet'}")
+        lines.append(f"  Duration: {scene.duration:.2f}s")
+        lines.append("")
+    return "\n".join(lines) + "\n"
+
+
+async def _prepare(config: dict, script_path: Path) -> Tuple[List[Scene], bool, Optional[str]]:
+    """Parse the script, import TTS and select music concurrently"""
+    return await asyncio.gather(
+        asyncio.to_thread(SceneParser().parse, str(script_path)),
+        asyncio.to_thread(_tts_available),
+        asyncio.to_thread(_select_music, config)
+    )
+
+
 def main():
     """Main demo function"""
     print("=" * 60)
@@ -26,21 +70,18 @@ def main():
     print("Step 1: Parsing the script...")
     script_path = Path(__file__).parent / "input" / "test_script.txt"
 
-    parser = SceneParser()
-    scenes = parser.parse(str(script_path))
+    # TTS import and music selection run while the script is parsed
+    scenes, tts_available, music_path = asyncio.run(_prepare(config, script_path))
 
     print(f"✓ Parsed {len(scenes)} scenes from the script")
+    print(f"✓ Background music: {music_path or 'Not available'}")
     print()
 
     # Display parsed scenes
     print("Parsed scenes:")
     print("-" * 60)
-    for scene in scenes:
-        print(f"Scene {scene.id}:")
-        print(f"  Text: {scene.text[:50]}..." if len(scene.text) > 50 else f"  Text: {scene.text}")
-        print(f"  Audio: {scene.audio_path or 'Not generated yet'}")
-        print(f"  Duration: {scene.duration:.2f}s")
-        print()
+    sys.stdout.write(_format_scenes(scenes, show_text=True))
+    sys.stdout.flush()
 
     # Step 2: Generate audio (optional - requires TTS models)
     print("-" * 60)
@@ -52,8 +93,7 @@ def main():
     print()
 
     # Check if TTS is available
-    try:
-        from TTS.api import TTS
+    if tts_available:
         print("✓ TTS library is installed")
 
         # Ask user if they want to generate audio
@@ -74,15 +114,11 @@ def main():
             print()
             print("Generated files:")
             print("-" * 60)
-            for scene in scenes:
-                print(f"Scene {scene.id}:")
-                print(f"  Audio: {scene.audio_path}")
-                print(f"  Duration: {scene.duration:.2f}s")
-                print()
+            sys.stdout.write(_format_scenes(scenes, show_text=False))
+            sys.stdout.flush()
         else:
             print("Skipping audio generation.")
-
-    except ImportError:
+    else:
         print("✗ TTS library not installed")
         print("  Install with: ./venv/bin/pip install TTS")
 
@@ -5,11 +5,165 @@ Handles background music selection, duration adjustment, and mixing
 
 import os
 import random
-from typing import List, Optional
+import subprocess
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import BinaryIO, List, Optional, Union
+import numpy as np
 from pydub import AudioSegment
 from pydub.effects import normalize
 
 
+# numpy sample types matching pydub's sample widths (bytes per sample)
+_SAMPLE_DTYPES = {1: np.int8, 2: np.int16, 4: np.int32}
+
+
+# Number of decoded tracks kept in memory
+_DECODE_CACHE_SIZE = 8
+
+
+# Decoders for extensions whose decoded sample format is known up front
+# (MP3 always decodes to 16-bit PCM), so pydub can skip its ffprobe call.
+# WAV is read natively by pydub without ffmpeg at all
+_KNOWN_CODECS = {'.mp3': 'mp3'}
+
+
+@lru_cache(maxsize=_DECODE_CACHE_SIZE)
+def _decode_audio(path: str, mtime_ns: int, size: int) -> AudioSegment:
+    """Decode an audio file (memoized; mtime and size invalidate the entry)"""
+    extension = os.path.splitext(path)[1].lower()
+    codec = _KNOWN_CODECS.get(extension)
+
+    if codec is not None:
+        return AudioSegment.from_file(path, format=extension[1:], codec=codec)
+
+    return AudioSegment.from_file(path)
+
+
+def _load_audio(path: str) -> AudioSegment:
+    """
+    Load an audio file, reusing the decoded segment if the file is unchanged
+
+    AudioSegment operations always return new segments, so the cached
+    object can be shared between callers without copying
+    """
+    stat = os.stat(path)
+    return _decode_audio(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+
+# ffmpeg raw PCM input formats matching pydub's sample widths
+# (pydub keeps 8-bit samples signed)
+_PCM_FORMATS = {1: 's8', 2: 's16le', 3: 's24le', 4: 's32le'}
+
+
+def _ffmpeg_encode(audio: AudioSegment, output_path: str, audio_format: str) -> None:
+    """
+    Encode an audio segment to a file by piping raw PCM into ffmpeg
+
+    Unlike AudioSegment.export, no temporary WAV or output copy is
+    written, and ffmpeg's stdout is discarded instead of being read back
+
+    Raises:
+        RuntimeError: If ffmpeg fails
+    """
+    command = [
+        AudioSegment.converter, '-y', '-loglevel', 'error',
+        '-f', _PCM_FORMATS[audio.sample_width],
+        '-ar', str(audio.frame_rate),
+        '-ac', str(audio.channels),
+        '-i', 'pipe:0'
+    ]
+
+    # Same encoder defaults as pydub (e.g. libvorbis for ogg)
+    codec = AudioSegment.DEFAULT_CODECS.get(audio_format)
+    if codec is not None:
+        command += ['-acodec', codec]
+
+    command += ['-f', audio_format, output_path]
+
+    result = subprocess.run(
+        command,
+        input=audio.raw_data,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"ffmpeg failed to encode {output_path}: "
+            f"{result.stderr.decode('utf-8', errors='replace').strip()}"
+        )
+
+
+def _read_wav_info(path: str) -> Optional[dict]:
+    """
+    Read stream properties of a PCM WAV file from its header
+
+    Returns:
+        Dictionary with duration and format fields, or None if the file
+        is not a WAV the wave module can parse
+    """
+    try:
+        with wave.open(path, 'rb') as wav_file:
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            frame_rate = wav_file.getframerate()
+            frames = wav_file.getnframes()
+    except (wave.Error, EOFError):
+        return None
+
+    return {
+        'duration': frames / float(frame_rate),
+        'channels': channels,
+        'sample_width': sample_width,
+        'frame_rate': frame_rate,
+        'frame_width': channels * sample_width
+    }
+
+
+def _segment_to_frames(segment: AudioSegment) -> np.ndarray:
+    """Return segment samples as a float32 array of shape (frames, channels)"""
+    samples = np.frombuffer(segment.raw_data, dtype=_SAMPLE_DTYPES[segment.sample_width])
+    return samples.astype(np.float32).reshape(-1, segment.channels)
+
+
+def _frames_to_segment(frames: np.ndarray, like: AudioSegment) -> AudioSegment:
+    """Clip float frames to the sample range and wrap them in an AudioSegment"""
+    dtype = _SAMPLE_DTYPES[like.sample_width]
+    limits = np.iinfo(dtype)
+
+    # float32 rounds the int32 maximum up to 2**31, which would wrap to
+    # the minimum on the cast; use the largest float below it instead
+    upper = frames.dtype.type(limits.max)
+    if int(upper) > limits.max:
+        upper = np.nextafter(upper, frames.dtype.type(0))
+
+    samples = np.clip(frames, limits.min, upper).astype(dtype)
+
+    return AudioSegment(
+        data=samples.tobytes(),
+        sample_width=like.sample_width,
+        frame_rate=like.frame_rate,
+        channels=like.channels
+    )
+
+
+def _fade_envelope(n_frames: int, fade_in_frames: int, fade_out_frames: int) -> np.ndarray:
+    """Build a linear fade in/out gain envelope with one value per frame"""
+    envelope = np.ones(n_frames, dtype=np.float32)
+
+    fade_in_frames = min(fade_in_frames, n_frames)
+    fade_out_frames = min(fade_out_frames, n_frames)
+
+    if fade_in_frames > 0:
+        envelope[:fade_in_frames] *= np.linspace(0.0, 1.0, fade_in_frames, dtype=np.float32)
+    if fade_out_frames > 0:
+        envelope[n_frames - fade_out_frames:] *= np.linspace(1.0, 0.0, fade_out_frames, dtype=np.float32)
+
+    return envelope
+
+
 class MusicSelector:
     """
     Selector for choosing and processing background music
@@ -17,6 +171,7 @@ class MusicSelector:
 
     # Supported audio formats
     SUPPORTED_FORMATS = ('.mp3', '.wav', '.ogg', '.flac', '.m4a')
+    _SUPPORTED_EXTENSIONS = frozenset(SUPPORTED_FORMATS)
 
     def __init__(self, config: dict):
         """
@@ -34,6 +189,10 @@ class MusicSelector:
         self.fade_in_duration = music_config.get('fade_in', 2.0)
         self.fade_out_duration = music_config.get('fade_out', 3.0)
 
+        # Formats: intermediate files stay uncompressed, final mix is encoded
+        self.intermediate_format = audio_config.get('intermediate_format', 'wav')
+        self.output_format = audio_config.get('output_format', 'mp3')
+
         # Paths
         paths_config = config.get('paths', {})
         self.music_dir = paths_config.get('music_dir', './assets/music')
@@ -84,21 +243,53 @@ class MusicSelector:
         """
         music_files = []
 
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
+        # scandir entries carry the file type, so no extra stat per file
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                _, dot, extension = entry.name.rpartition('.')
 
-            # Check if it's a file and has supported extension
-            if os.path.isfile(filepath) and filename.lower().endswith(self.SUPPORTED_FORMATS):
-                music_files.append(filepath)
+                # Check if it has supported extension and is a file
+                if dot and f".{extension.lower()}" in self._SUPPORTED_EXTENSIONS and entry.is_file():
+                    music_files.append(entry.path)
 
         return sorted(music_files)  # Sort for consistent ordering
 
+    def preload(self, music_files: List[str] = None, max_workers: int = 4) -> None:
+        """
+        Decode music files ahead of time to warm the decode cache
+
+        Decoding runs in ffmpeg subprocesses, so a thread pool overlaps
+        disk reads and decoding of several files. Later calls on the same
+        (unchanged) files reuse the decoded audio.
+
+        Args:
+            music_files: Paths to decode (uses all files in music_dir if None)
+            max_workers: Maximum number of concurrent decodes
+
+        Raises:
+            RuntimeError: If a file cannot be decoded
+
+        Note:
+            At most as many files as the decode cache holds are loaded
+        """
+        if music_files is None:
+            music_files = self._get_music_files(self.music_dir)
+
+        music_files = music_files[:_DECODE_CACHE_SIZE]
+
+        try:
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                list(executor.map(_load_audio, music_files))
+        except Exception as e:
+            raise RuntimeError(f"Failed to preload music: {e}")
+
     def adjust_duration(
         self,
         music_path: str,
         target_duration: float,
-        output_dir: str = None
-    ) -> str:
+        output_dir: str = None,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
         """
         Adjust music duration to match target (trim or loop)
 
@@ -106,9 +297,11 @@ class MusicSelector:
             music_path: Path to source music file
             target_duration: Target duration in seconds
             output_dir: Directory to save adjusted music
+            output: Writable binary file object (e.g. io.BytesIO) to export
+                into instead of a file in output_dir
 
         Returns:
-            Path to adjusted music file
+            Path to adjusted music file, or output (rewound) if given
 
         Raises:
             FileNotFoundError: If source music doesn't exist
@@ -123,40 +316,19 @@ class MusicSelector:
 
         try:
             # Load music
-            music = AudioSegment.from_file(music_path)
-
-            # Get original duration in milliseconds
-            original_duration_ms = len(music)
-            target_duration_ms = int(target_duration * 1000)
-
-            if original_duration_ms > target_duration_ms:
-                # Trim music to target duration
-                adjusted_music = music[:target_duration_ms]
-            elif original_duration_ms < target_duration_ms:
-                # Loop music to reach target duration
-                loops_needed = (target_duration_ms // original_duration_ms) + 1
-                looped_music = music * int(loops_needed)
-                adjusted_music = looped_music[:target_duration_ms]
-            else:
-                # Duration matches exactly
-                adjusted_music = music
+            music = _load_audio(music_path)
+
+            # Trim or loop music to target duration
+            adjusted_music = self._fit_duration(music, int(target_duration * 1000))
 
             # Generate output filename
             if output_dir is None:
                 output_dir = os.path.join(os.path.dirname(music_path), 'adjusted')
 
-            os.makedirs(output_dir, exist_ok=True)
+            name, _ = os.path.splitext(os.path.basename(music_path))
+            output_filename = f"{name}_adjusted_{int(target_duration)}s.{self.intermediate_format}"
 
-            # Create output filename
-            base_name = os.path.basename(music_path)
-            name, _ = os.path.splitext(base_name)
-            output_filename = f"{name}_adjusted_{int(target_duration)}s.mp3"
-            output_path = os.path.join(output_dir, output_filename)
-
-            # Export adjusted music
-            adjusted_music.export(output_path, format='mp3')
-
-            return output_path
+            return self._export(adjusted_music, output_dir, output_filename, output)
 
         except Exception as e:
             raise RuntimeError(f"Failed to adjust music duration {music_path}: {e}")
@@ -166,8 +338,9 @@ class MusicSelector:
         music_path: str,
         fade_in: float = None,
         fade_out: float = None,
-        output_dir: str = None
-    ) -> str:
+        output_dir: str = None,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
         """
         Apply fade in/out effects to music
 
@@ -176,9 +349,11 @@ class MusicSelector:
             fade_in: Fade in duration in seconds (uses config default if None)
             fade_out: Fade out duration in seconds (uses config default if None)
             output_dir: Directory to save processed music
+            output: Writable binary file object (e.g. io.BytesIO) to export
+                into instead of a file in output_dir
 
         Returns:
-            Path to processed music file
+            Path to processed music file, or output (rewound) if given
 
         Raises:
             FileNotFoundError: If source music doesn't exist
@@ -194,30 +369,19 @@ class MusicSelector:
 
         try:
             # Load music
-            music = AudioSegment.from_file(music_path)
+            music = _load_audio(music_path)
 
             # Apply fade effects
-            fade_in_ms = int(fade_in * 1000)
-            fade_out_ms = int(fade_out * 1000)
-
-            faded_music = music.fade_in(fade_in_ms).fade_out(fade_out_ms)
+            faded_music = self._apply_fade(music, fade_in, fade_out)
 
             # Generate output filename
             if output_dir is None:
                 output_dir = os.path.join(os.path.dirname(music_path), 'faded')
 
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Create output filename
-            base_name = os.path.basename(music_path)
-            name, _ = os.path.splitext(base_name)
-            output_filename = f"{name}_faded.mp3"
-            output_path = os.path.join(output_dir, output_filename)
+            name, _ = os.path.splitext(os.path.basename(music_path))
+            output_filename = f"{name}_faded.{self.intermediate_format}"
 
-            # Export faded music
-            faded_music.export(output_path, format='mp3')
-
-            return output_path
+            return self._export(faded_music, output_dir, output_filename, output)
 
         except Exception as e:
             raise RuntimeError(f"Failed to apply fade effects to {music_path}: {e}")
@@ -226,8 +390,9 @@ class MusicSelector:
         self,
         music_path: str,
         volume_level: float = None,
-        output_dir: str = None
-    ) -> str:
+        output_dir: str = None,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
         """
         Adjust music volume
 
@@ -235,9 +400,11 @@ class MusicSelector:
             music_path: Path to source music file
             volume_level: Volume level (0.0 to 1.0), uses config default if None
             output_dir: Directory to save adjusted music
+            output: Writable binary file object (e.g. io.BytesIO) to export
+                into instead of a file in output_dir
 
         Returns:
-            Path to volume-adjusted music file
+            Path to volume-adjusted music file, or output (rewound) if given
 
         Raises:
             FileNotFoundError: If source music doesn't exist
@@ -255,40 +422,19 @@ class MusicSelector:
 
         try:
             # Load music
-            music = AudioSegment.from_file(music_path)
-
-            # Calculate volume change in dB
-            # 0.0 volume -> -infinity dB (silence)
-            # 1.0 volume -> 0 dB (no change)
-            # Formula: dB = 20 * log10(volume_level)
-            # We use a simpler linear approximation for clarity
-            if volume_level == 0.0:
-                db_change = -100  # Effectively silent
-            else:
-                # Convert 0.0-1.0 to dB scale
-                # Reference: 1.0 = 0dB, 0.5 = -6dB, 0.25 = -12dB
-                import math
-                db_change = 20 * math.log10(volume_level)
+            music = _load_audio(music_path)
 
             # Apply volume change
-            adjusted_music = music + db_change
+            adjusted_music = self._adjust_volume(music, volume_level)
 
             # Generate output filename
             if output_dir is None:
                 output_dir = os.path.join(os.path.dirname(music_path), 'adjusted_volume')
 
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Create output filename
-            base_name = os.path.basename(music_path)
-            name, _ = os.path.splitext(base_name)
-            output_filename = f"{name}_vol_{int(volume_level * 100)}.mp3"
-            output_path = os.path.join(output_dir, output_filename)
-
-            # Export adjusted music
-            adjusted_music.export(output_path, format='mp3')
+            name, _ = os.path.splitext(os.path.basename(music_path))
+            output_filename = f"{name}_vol_{int(volume_level * 100)}.{self.intermediate_format}"
 
-            return output_path
+            return self._export(adjusted_music, output_dir, output_filename, output)
 
         except Exception as e:
             raise RuntimeError(f"Failed to adjust volume for {music_path}: {e}")
@@ -318,7 +464,8 @@ class MusicSelector:
 
         Note:
             Music is automatically adjusted to match voice duration
-            and volume-adjusted before mixing
+            and volume-adjusted before mixing. All steps run in memory
+            and the result is encoded once.
         """
         if not os.path.exists(voice_path):
             raise FileNotFoundError(f"Voice file not found: {voice_path}")
@@ -330,65 +477,176 @@ class MusicSelector:
 
         try:
             # Load audio files
-            voice = AudioSegment.from_file(voice_path)
-            music = AudioSegment.from_file(music_path)
-
-            # Get voice duration
-            voice_duration_ms = len(voice)
-            voice_duration_sec = voice_duration_ms / 1000.0
-
-            # Adjust music duration to match voice
-            target_duration_ms = voice_duration_ms
-            music_duration_ms = len(music)
-
-            if music_duration_ms > target_duration_ms:
-                # Trim music
-                adjusted_music = music[:target_duration_ms]
-            elif music_duration_ms < target_duration_ms:
-                # Loop music
-                loops_needed = (target_duration_ms // music_duration_ms) + 1
-                looped_music = music * int(loops_needed)
-                adjusted_music = looped_music[:target_duration_ms]
-            else:
-                adjusted_music = music
-
-            # Apply fade effects to music
-            fade_in_ms = int(self.fade_in_duration * 1000)
-            fade_out_ms = int(self.fade_out_duration * 1000)
-            faded_music = adjusted_music.fade_in(fade_in_ms).fade_out(fade_out_ms)
-
-            # Adjust music volume
-            import math
-            if music_volume == 0.0:
-                db_change = -100
-            else:
-                db_change = 20 * math.log10(music_volume)
-
-            volume_adjusted_music = faded_music + db_change
-
-            # Mix voice and music (overlay)
-            mixed_audio = voice.overlay(volume_adjusted_music)
+            voice = _load_audio(voice_path)
+            music = _load_audio(music_path)
+
+            # Mix voice and music
+            mixed_audio = self._mix(voice, music, music_volume)
 
             # Generate output filename
             if output_dir is None:
                 output_dir = os.path.join(os.path.dirname(voice_path), 'mixed')
 
-            os.makedirs(output_dir, exist_ok=True)
-
-            # Create output filename
-            voice_base = os.path.basename(voice_path)
-            voice_name, _ = os.path.splitext(voice_base)
-            output_filename = f"{voice_name}_with_music.mp3"
-            output_path = os.path.join(output_dir, output_filename)
+            voice_name, _ = os.path.splitext(os.path.basename(voice_path))
+            output_filename = f"{voice_name}_with_music.{self.output_format}"
 
-            # Export mixed audio
-            mixed_audio.export(output_path, format='mp3')
-
-            return output_path
+            return self._export(mixed_audio, output_dir, output_filename)
 
         except Exception as e:
             raise RuntimeError(f"Failed to mix voice and music: {e}")
 
+    def _fit_duration(self, music: AudioSegment, target_duration_ms: int) -> AudioSegment:
+        """
+        Trim or loop audio to the target duration
+
+        Args:
+            music: Source audio segment
+            target_duration_ms: Target duration in milliseconds
+
+        Returns:
+            Audio segment with the target duration
+
+        Note:
+            Looping tiles the raw PCM frames with numpy in a single allocation
+            instead of concatenating AudioSegment copies
+        """
+        target_frames = int(target_duration_ms * music.frame_rate / 1000)
+
+        if target_frames == int(music.frame_count()):
+            # Duration matches exactly
+            return music
+
+        # np.resize repeats the buffer cyclically (loop) or truncates it (trim)
+        raw = np.frombuffer(music.raw_data, dtype=np.uint8)
+        data = np.resize(raw, target_frames * music.frame_width)
+
+        return AudioSegment(
+            data=data.tobytes(),
+            sample_width=music.sample_width,
+            frame_rate=music.frame_rate,
+            channels=music.channels
+        )
+
+    def _apply_fade(self, music: AudioSegment, fade_in: float, fade_out: float) -> AudioSegment:
+        """
+        Apply fade in/out to an audio segment
+
+        Args:
+            music: Source audio segment
+            fade_in: Fade in duration in seconds
+            fade_out: Fade out duration in seconds
+
+        Returns:
+            Faded audio segment
+        """
+        # One envelope multiply over all frames
+        frames = _segment_to_frames(music)
+        envelope = _fade_envelope(
+            len(frames),
+            int(fade_in * music.frame_rate),
+            int(fade_out * music.frame_rate)
+        )
+
+        return _frames_to_segment(frames * envelope[:, np.newaxis], music)
+
+    def _adjust_volume(self, music: AudioSegment, volume_level: float) -> AudioSegment:
+        """
+        Change the volume of an audio segment
+
+        Args:
+            music: Source audio segment
+            volume_level: Volume level (0.0 to 1.0)
+
+        Returns:
+            Volume-adjusted audio segment
+
+        Note:
+            The level is a linear amplitude factor (0.5 = -6 dB,
+            0.25 = -12 dB, 0.0 = silence), applied as one numpy multiply
+            like the mix envelope
+        """
+        if volume_level == 1.0:
+            return music
+
+        return _frames_to_segment(_segment_to_frames(music) * volume_level, music)
+
+    def _mix(self, voice: AudioSegment, music: AudioSegment, music_volume: float) -> AudioSegment:
+        """
+        Mix music under voice with looping, fades and volume applied
+
+        Args:
+            voice: Voice audio segment (defines the output length)
+            music: Background music segment
+            music_volume: Music volume level (0.0-1.0)
+
+        Returns:
+            Mixed audio segment
+
+        Note:
+            Looping, fades, volume and overlay are applied in one numpy
+            pass over the samples
+        """
+        # Bring both tracks to a common format (as AudioSegment.overlay does)
+        channels = max(voice.channels, music.channels)
+        frame_rate = max(voice.frame_rate, music.frame_rate)
+        sample_width = max(voice.sample_width, music.sample_width)
+        voice = voice.set_channels(channels).set_frame_rate(frame_rate).set_sample_width(sample_width)
+        music = music.set_channels(channels).set_frame_rate(frame_rate).set_sample_width(sample_width)
+
+        voice_frames = _segment_to_frames(voice)
+
+        # Loop or trim music to the voice length
+        music_frames = np.resize(_segment_to_frames(music), voice_frames.shape)
+
+        # Fade envelope for music (one gain per frame)
+        envelope = _fade_envelope(
+            len(voice_frames),
+            int(self.fade_in_duration * frame_rate),
+            int(self.fade_out_duration * frame_rate)
+        )
+
+        # voice + volume * fade * music
+        envelope *= music_volume
+
+        return _frames_to_segment(voice_frames + music_frames * envelope[:, np.newaxis], voice)
+
+    def _export(
+        self,
+        audio: AudioSegment,
+        output_dir: str,
+        output_filename: str,
+        output: Optional[BinaryIO] = None
+    ) -> Union[str, BinaryIO]:
+        """
+        Encode an audio segment into the output directory or a file object
+
+        Args:
+            audio: Audio segment to export
+            output_dir: Directory to save the file (created if missing)
+            output_filename: Output file name; its extension selects the format
+            output: File object to export into instead of writing to disk
+
+        Returns:
+            Path to exported file, or output rewound to the start if given
+        """
+        audio_format = os.path.splitext(output_filename)[1].lstrip('.')
+
+        if output is not None:
+            # Encoded data stays in memory; nothing is written to output_dir
+            return audio.export(output, format=audio_format)
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        output_path = os.path.join(output_dir, output_filename)
+
+        if audio_format == 'wav':
+            # Written natively by pydub, no ffmpeg process
+            audio.export(output_path, format=audio_format)
+        else:
+            _ffmpeg_encode(audio, output_path, audio_format)
+
+        return output_path
+
     def get_audio_info(self, audio_path: str) -> dict:
         """
         Get information about an audio file
@@ -401,12 +659,24 @@ class MusicSelector:
 
         Raises:
             FileNotFoundError: If audio file doesn't exist
+
+        Note:
+            PCM WAV files are described from their header without decoding;
+            other formats (and WAV layouts the wave module rejects) are
+            decoded through the decode cache
         """
         if not os.path.exists(audio_path):
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
         try:
-            audio = AudioSegment.from_file(audio_path)
+            # WAV: header only, no decode
+            if audio_path.lower().endswith('.wav'):
+                info = _read_wav_info(audio_path)
+                if info is not None:
+                    info['size'] = os.path.getsize(audio_path)
+                    return info
+
+            audio = _load_audio(audio_path)
 
             return {
                 'duration': len(audio) / 1000.0,  # Convert to seconds
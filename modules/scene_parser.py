@@ -5,11 +5,21 @@ Handles parsing text files into Scene objects
 
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Dict
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 import re
+import sys
+import numpy as np
 
 
-@dataclass
+# Paragraph separator: a blank line (possibly containing whitespace)
+_PARAGRAPH_SEPARATOR = re.compile(r'\n\s*\n')
+
+
+# __slots__ dataclasses (no per-instance __dict__) need Python 3.10+
+_DATACLASS_OPTIONS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+
+@dataclass(**_DATACLASS_OPTIONS)
 class Scene:
     """
     Represents a single scene in the video
@@ -37,6 +47,10 @@ class SceneParser:
     Parser for converting text files into Scene objects
     """
 
+    # Supported script formats
+    SUPPORTED_FORMATS = ('.txt', '.md')
+    _SUPPORTED_EXTENSIONS = frozenset(SUPPORTED_FORMATS)
+
     def __init__(self):
         """Initialize the scene parser"""
         pass
@@ -51,34 +65,110 @@ class SceneParser:
         Returns:
             List of Scene objects
 
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the file format is not supported
+        """
+        return list(self.iter_scenes(file_path))
+
+    def parse_columnar(self, file_path: str) -> Dict[str, Any]:
+        """
+        Parse a text file into column-oriented scene data (struct of arrays)
+
+        Args:
+            file_path: Path to the text file (.txt or .md)
+
+        Returns:
+            Dictionary of equally long columns: 'id' (int64 array),
+            'text' (list of str), 'duration' (float64 array of zeros) and
+            'audio_path', 'subtitle_path', 'image_path' (lists of None)
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist
+            ValueError: If the file format is not supported
+        """
+        ids = []
+        texts = []
+
+        for scene in self.iter_scenes(file_path):
+            ids.append(scene.id)
+            texts.append(scene.text)
+
+        count = len(texts)
+
+        return {
+            'id': np.array(ids, dtype=np.int64),
+            'text': texts,
+            'duration': np.zeros(count, dtype=np.float64),
+            'audio_path': [None] * count,
+            'subtitle_path': [None] * count,
+            'image_path': [None] * count
+        }
+
+    def iter_scenes(self, file_path: str) -> Iterator[Scene]:
+        """
+        Lazily parse a text file, yielding Scene objects one at a time
+
+        The file is read line by line, so only the current paragraph is
+        held in memory rather than the whole script.
+
+        Args:
+            file_path: Path to the text file (.txt or .md)
+
+        Returns:
+            Iterator over Scene objects
+
         Raises:
             FileNotFoundError: If the file doesn't exist
             ValueError: If the file format is not supported
         """
         path = Path(file_path)
 
-        if not path.exists():
+        if not path.is_file():
             raise FileNotFoundError(f"File not found: {file_path}")
 
-        if path.suffix not in ['.txt', '.md']:
+        if path.suffix.lower() not in self._SUPPORTED_EXTENSIONS:
             raise ValueError(f"Unsupported file format: {path.suffix}. Use .txt or .md")
 
-        # Read file content
+        return self._read_scenes(path)
+
+    def _read_scenes(self, path: Path) -> Iterator[Scene]:
+        """
+        Stream scenes from a validated file
+
+        Args:
+            path: Path to the text file
+
+        Yields:
+            Scene objects
+        """
         with open(path, 'r', encoding='utf-8') as f:
-            content = f.read()
+            for idx, text in enumerate(self._iter_paragraphs(f), start=1):
+                cleaned_text = self.clean_text(text)
+                if cleaned_text:  # Ignore empty scenes
+                    yield Scene(id=idx, text=cleaned_text)
+
+    def _iter_paragraphs(self, lines: Iterable[str]) -> Iterator[str]:
+        """
+        Group lines into paragraphs separated by blank lines
+
+        Args:
+            lines: Iterable of text lines (e.g. an open file)
 
-        # Split into scenes
-        scene_texts = self.split_into_scenes(content)
+        Yields:
+            Paragraph texts (same boundaries as split_into_scenes)
+        """
+        paragraph = []
 
-        # Create Scene objects
-        scenes = []
-        for idx, text in enumerate(scene_texts, start=1):
-            cleaned_text = self.clean_text(text)
-            if cleaned_text:  # Ignore empty scenes
-                scene = Scene(id=idx, text=cleaned_text)
-                scenes.append(scene)
+        for line in lines:
+            if line.strip():
+                paragraph.append(line)
+            elif paragraph:
+                yield ''.join(paragraph)
+                paragraph = []
 
-        return scenes
+        if paragraph:
+            yield ''.join(paragraph)
 
     def split_into_scenes(self, text: str) -> List[str]:
         """
@@ -90,13 +180,9 @@ class SceneParser:
         Returns:
             List of scene texts
         """
-        # Split by double newlines (paragraph separator)
-        scenes = re.split(r'\n\s*\n', text)
-
-        # Filter out empty scenes
-        scenes = [s.strip() for s in scenes if s.strip()]
-
-        return scenes
+        # Split by double newlines (paragraph separator), strip each part
+        # once and filter out empty scenes
+        return [scene for scene in (part.strip() for part in _PARAGRAPH_SEPARATOR.split(text)) if scene]
 
     def clean_text(self, text: str) -> str:
         """
@@ -108,10 +194,5 @@ class SceneParser:
         Returns:
             Cleaned text
         """
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text)
-
-        # Strip leading/trailing whitespace
-        text = text.strip()
-
-        return text
+        # Collapse whitespace runs and strip leading/trailing whitespace
+        return ' '.join(text.split())
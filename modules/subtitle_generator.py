@@ -4,16 +4,63 @@ Handles subtitle generation and synchronization with audio
 """
 
 import os
-import pysrt
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import List, Tuple
+import numpy as np
 from modules.scene_parser import Scene
 
 
+# SRT timestamp template (HH:MM:SS,mmm), parsed once and bound as a function
+_SRT_FMT = "{:02d}:{:02d}:{:02d},{:03d}".format
+
+# One SRT entry: index, time range (hours, minutes, seconds, milliseconds
+# captured separately) and text up to the blank line ending the entry
+_SRT_ENTRY = re.compile(
+    r'(\d+)\n(\d+):(\d\d):(\d\d),(\d{3}) --> (\d+):(\d\d):(\d\d),(\d{3})\n(.*?)(?:\n\n|\n?\Z)',
+    re.S
+)
+
+
+def parse_srt(path: str) -> List[Tuple[float, float, str]]:
+    """
+    Read subtitle timings back from an SRT file
+
+    Args:
+        path: Path to the SRT file
+
+    Returns:
+        List of tuples (start_time, end_time, subtitle_text), the same
+        shape SubtitleGenerator.calculate_timings returns
+
+    Raises:
+        FileNotFoundError: If the file doesn't exist
+
+    Note:
+        The whole file is matched with one compiled pattern instead of a
+        line-by-line parser
+    """
+    text = Path(path).read_text(encoding='utf-8-sig').replace('\r\n', '\n')
+
+    return [
+        (
+            int(h1) * 3600 + int(m1) * 60 + int(s1) + int(ms1) / 1000.0,
+            int(h2) * 3600 + int(m2) * 60 + int(s2) + int(ms2) / 1000.0,
+            subtitle_text
+        )
+        for _, h1, m1, s1, ms1, h2, m2, s2, ms2, subtitle_text in _SRT_ENTRY.findall(text)
+    ]
+
+
 class SubtitleGenerator:
     """
     Generator for creating synchronized SRT subtitle files
     """
 
+    # Supported ways to distribute scene duration across lines
+    TIMING_WEIGHTS = ('words', 'chars')
+
     def __init__(self, config: dict):
         """
         Initialize subtitle generator
@@ -30,13 +77,23 @@ class SubtitleGenerator:
         self.font_size = subtitle_config.get('font_size', 48)
         self.color = subtitle_config.get('color', 'white')
 
-    def generate(self, scene: Scene, output_dir: str) -> str:
+        # Distribute duration by word count or by character count per line
+        self.timing_weight = subtitle_config.get('timing_weight', 'words')
+        if self.timing_weight not in self.TIMING_WEIGHTS:
+            raise ValueError(
+                f"Unsupported subtitle timing weight: {self.timing_weight}. "
+                f"Use one of {self.TIMING_WEIGHTS}"
+            )
+
+    def generate(self, scene: Scene, output_dir: str, _ensure_dir: bool = True) -> str:
         """
         Generate subtitle file for a scene
 
         Args:
             scene: Scene object with text and duration
             output_dir: Directory to save subtitle file
+            _ensure_dir: Create output_dir if needed (batch_generate creates
+                it once up front and skips the per-scene check)
 
         Returns:
             Path to generated SRT file
@@ -52,18 +109,18 @@ class SubtitleGenerator:
             )
 
         # Create output directory if needed
-        os.makedirs(output_dir, exist_ok=True)
+        if _ensure_dir:
+            os.makedirs(output_dir, exist_ok=True)
 
         # Generate output filename
         output_filename = f"scene_{scene.id:03d}_subtitle.srt"
         output_path = os.path.join(output_dir, output_filename)
 
         try:
-            # Calculate subtitle timings
-            timings = self.calculate_timings(scene.text, scene.duration)
-
-            # Create SRT file
-            self._create_srt_file(timings, output_path)
+            # Lay out, time and format the subtitles in one pass, then save
+            # the file in a single write
+            srt_text = self._generate_srt_text(scene.text, scene.duration)
+            Path(output_path).write_text(srt_text, encoding='utf-8')
 
             return output_path
 
@@ -92,31 +149,42 @@ class SubtitleGenerator:
             max_chars = self.max_chars_per_line
 
         words = text.split()
-        lines = []
-        current_line = []
-        current_length = 0
+        breaks = self._line_breaks(words, max_chars)
 
-        for word in words:
-            word_length = len(word)
-            # +1 for the space before the word
-            space_needed = word_length + (1 if current_line else 0)
+        return [' '.join(words[start:end]) for start, end in zip(breaks, breaks[1:])]
+
+    def _line_breaks(self, words: List[str], max_chars: int) -> List[int]:
+        """
+        Greedily pack words into lines
+
+        Args:
+            words: Words to pack
+            max_chars: Maximum characters per line
+
+        Returns:
+            Word indices where lines start, followed by len(words);
+            empty if there are no words. Line i spans
+            words[breaks[i]:breaks[i + 1]], so the list is also the
+            cumulative word count at each line boundary.
+        """
+        if not words:
+            return []
+
+        breaks = [0]
+        current_length = len(words[0])
 
-            if current_length + space_needed <= max_chars:
-                # Word fits in current line
-                current_line.append(word)
-                current_length += space_needed
+        for idx in range(1, len(words)):
+            word_length = len(words[idx])
+            # +1 for the space before the word
+            if current_length + word_length + 1 <= max_chars:
+                current_length += word_length + 1
             else:
-                # Start new line
-                if current_line:
-                    lines.append(' '.join(current_line))
-                current_line = [word]
+                breaks.append(idx)
                 current_length = word_length
 
-        # Add last line
-        if current_line:
-            lines.append(' '.join(current_line))
+        breaks.append(len(words))
 
-        return lines
+        return breaks
 
     def calculate_timings(self, text: str, duration: float) -> List[Tuple[float, float, str]]:
         """
@@ -131,90 +199,91 @@ class SubtitleGenerator:
 
         Algorithm:
             1. Split text into lines respecting max_chars_per_line
-            2. Calculate time per word
-            3. Distribute time proportionally to word count in each line
+            2. Calculate time per word (or per character with
+               timing_weight: chars)
+            3. Distribute time proportionally to word (character) count
+               in each line
         """
-        # Split text into lines
-        lines = self.split_into_lines(text)
-
-        if not lines:
-            return []
+        lines, boundaries = self._layout_lines(text, duration)
 
-        # Count total words
-        total_words = sum(len(line.split()) for line in lines)
+        return list(zip(boundaries[:-1], boundaries[1:], lines))
 
-        if total_words == 0:
-            return []
-
-        # Calculate time per word
-        time_per_word = duration / total_words
+    def _layout_lines(self, text: str, duration: float) -> Tuple[List[str], List[float]]:
+        """
+        Split text into subtitle lines and compute their time boundaries
 
-        # Calculate timings for each line
-        timings = []
-        current_time = 0.0
+        Args:
+            text: Text to create subtitles for
+            duration: Total duration in seconds
 
-        for line in lines:
-            words_in_line = len(line.split())
-            line_duration = words_in_line * time_per_word
+        Returns:
+            Tuple of (lines, boundaries) where line i spans
+            boundaries[i]..boundaries[i + 1]; both empty for empty text
+        """
+        # Split text into lines (word indices of line boundaries)
+        words = text.split()
+        breaks = self._line_breaks(words, self.max_chars_per_line)
 
-            start_time = current_time
-            end_time = current_time + line_duration
+        if not breaks:
+            return [], []
 
-            timings.append((start_time, end_time, line))
+        lines = [' '.join(words[start:end]) for start, end in zip(breaks, breaks[1:])]
 
-            current_time = end_time
+        if self.timing_weight == 'chars':
+            # Cumulative character counts of the lines (spaces between
+            # lines excluded); long words get proportionally more time
+            boundaries = np.zeros(len(lines) + 1, dtype=np.float64)
+            np.cumsum([len(line) for line in lines], out=boundaries[1:])
+            boundaries *= duration / boundaries[-1]
+        else:
+            # Line boundaries are cumulative word counts, so scaling them by the
+            # time per word gives every start/end time in one vectorized multiply
+            boundaries = np.asarray(breaks, dtype=np.float64) * (duration / len(words))
 
-        return timings
+        return lines, boundaries.tolist()
 
-    def _create_srt_file(self, timings: List[Tuple[float, float, str]], output_path: str):
+    def _generate_srt_text(self, text: str, duration: float) -> str:
         """
-        Create SRT file from timings
+        Build the SRT document for a text in one pass
 
         Args:
-            timings: List of (start, end, text) tuples
-            output_path: Path where to save the SRT file
-        """
-        subs = pysrt.SubRipFile()
-
-        for idx, (start, end, text) in enumerate(timings, start=1):
-            # Convert seconds to SubRipTime format (hours, minutes, seconds, milliseconds)
-            start_time = self._seconds_to_srt_time(start)
-            end_time = self._seconds_to_srt_time(end)
-
-            # Create subtitle item
-            sub = pysrt.SubRipItem(
-                index=idx,
-                start=start_time,
-                end=end_time,
-                text=text
-            )
+            text: Text to create subtitles for
+            duration: Total duration in seconds
 
-            subs.append(sub)
+        Returns:
+            SRT text for calculate_timings' entries
 
-        # Save to file
-        subs.save(output_path, encoding='utf-8')
+        Note:
+            Consecutive lines share a boundary, so each timestamp is
+            formatted once instead of once as an end and again as the
+            next start, and no (start, end, text) tuples are built
+        """
+        lines, boundaries = self._layout_lines(text, duration)
+        stamps = [self._format_srt_time(boundary) for boundary in boundaries]
 
-    def _seconds_to_srt_time(self, seconds: float) -> pysrt.SubRipTime:
+        return ''.join([
+            f"{idx}\n{stamps[idx - 1]} --> {stamps[idx]}\n{line}\n\n"
+            for idx, line in enumerate(lines, start=1)
+        ])
+
+    def _format_srt_time(self, seconds: float) -> str:
         """
-        Convert seconds to SubRipTime object
+        Convert seconds to SRT timestamp
 
         Args:
             seconds: Time in seconds
 
         Returns:
-            SubRipTime object
-        """
-        hours = int(seconds // 3600)
-        minutes = int((seconds % 3600) // 60)
-        secs = int(seconds % 60)
-        milliseconds = int((seconds % 1) * 1000)
-
-        return pysrt.SubRipTime(
-            hours=hours,
-            minutes=minutes,
-            seconds=secs,
-            milliseconds=milliseconds
-        )
+            Timestamp in HH:MM:SS,mmm format
+        """
+        # Round once to whole milliseconds, then split with integer divmods
+        # (float modulo truncates values such as 2.9999999 down to 02,999)
+        total_ms = int(round(seconds * 1000))
+        hours, remainder = divmod(total_ms, 3600000)
+        minutes, remainder = divmod(remainder, 60000)
+        secs, milliseconds = divmod(remainder, 1000)
+
+        return _SRT_FMT(hours, minutes, secs, milliseconds)
 
     def batch_generate(self, scenes: List[Scene], output_dir: str) -> None:
         """
@@ -225,9 +294,27 @@ class SubtitleGenerator:
             output_dir: Directory to save subtitle files
 
         Note:
-            This method updates each scene's subtitle_path
+            This method updates each scene's subtitle_path. Scenes are
+            written concurrently in a thread pool.
         """
-        for scene in scenes:
-            if scene.duration > 0:  # Only generate if duration is set
-                subtitle_path = self.generate(scene, output_dir)
-                scene.subtitle_path = subtitle_path
+        # Only generate if duration is set
+        pending = [scene for scene in scenes if scene.duration > 0]
+
+        if not pending:
+            return
+
+        # Create the shared output directory once instead of per scene
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Each scene is an independent file write; the GIL is released
+        # during the write syscalls, so threads overlap the I/O
+        workers = min(8, len(pending))
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            subtitle_paths = list(executor.map(
+                lambda scene: self.generate(scene, output_dir, _ensure_dir=False),
+                pending
+            ))
+
+        for scene, subtitle_path in zip(pending, subtitle_paths):
+            scene.subtitle_path = subtitle_path
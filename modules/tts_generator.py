@@ -3,13 +3,67 @@ TTS Generator Module
 Handles text-to-speech generation using Coqui TTS
 """
 
+import contextlib
+import mmap
+import multiprocessing
 import os
+import struct
+import threading
 import wave
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
+import numpy as np
 from modules.scene_parser import Scene
 
 
+# Canonical 44-byte PCM WAV header: RIFF, fmt (16 bytes) and data chunk headers
+_WAV_HEADER = struct.Struct('<4sI4s4sIHHIIHH4sI')
+
+# WAV format code for G.711 mu-law audio
+_WAVE_FORMAT_MULAW = 7
+
+# Upper bounds of the eight G.711 mu-law segments (14-bit magnitudes)
+_MULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+
+# Loaded TTS models shared by all generators in the process,
+# keyed by (model_name, device, precision, compile)
+_MODEL_CACHE: Dict[Tuple[str, str, str, bool], object] = {}
+_MODEL_CACHE_LOCK = threading.Lock()
+
+# Worker count for tts.workers: auto on CPU; every worker holds its own
+# model copy (several GB for XTTS), so more cores do not mean more workers
+_AUTO_CPU_WORKERS = 2
+
+# Per-process generator used by batch_generate workers
+_worker_generator: Optional["TTSGenerator"] = None
+
+
+def _init_worker(config: dict, devices=None) -> None:
+    """
+    Create a generator and load the TTS model once per worker process
+
+    Args:
+        config: Configuration dictionary with TTS settings
+        devices: Optional queue of device names; each worker takes one,
+            which pins workers to separate GPUs
+    """
+    global _worker_generator
+    if devices is not None:
+        tts_config = dict(config.get('tts', {}), device=devices.get())
+        config = dict(config, tts=tts_config)
+
+    _worker_generator = TTSGenerator(config)
+    _worker_generator._initialize_tts()
+
+
+def _generate_in_worker(scene_id: int, text: str, output_dir: str) -> Tuple[str, float]:
+    """Generate audio for a scene (sent as plain id/text) inside a worker process"""
+    scene = Scene(id=scene_id, text=text)
+    audio_path = _worker_generator.generate(scene, output_dir, _ensure_dir=False)
+    return audio_path, scene.duration
+
+
 class TTSGenerator:
     """
     Text-to-Speech generator using Coqui TTS
@@ -21,6 +75,9 @@ class TTSGenerator:
         "en": "tts_models/en/ljspeech/vits"
     }
 
+    # Supported inference precisions
+    PRECISIONS = ('fp32', 'fp16', 'bf16', 'int8')
+
     def __init__(self, config: dict):
         """
         Initialize TTS generator
@@ -32,6 +89,27 @@ class TTSGenerator:
         self.language = config.get('tts', {}).get('language', 'ru')
         self.speed = config.get('tts', {}).get('speed', 1.0)
 
+        # Number of worker processes for batch generation (1 = sequential,
+        # 'auto' = one per GPU, or a small fixed number on CPU)
+        self.workers = config.get('tts', {}).get('workers', 1)
+
+        # Inference device: auto | cpu | cuda
+        self.device = config.get('tts', {}).get('device', 'auto')
+
+        # Inference precision: fp16/bf16 apply on GPU, int8 on CPU
+        self.precision = config.get('tts', {}).get('precision', 'fp32')
+        if self.precision not in self.PRECISIONS:
+            raise ValueError(
+                f"Unsupported TTS precision: {self.precision}. "
+                f"Use one of {self.PRECISIONS}"
+            )
+
+        # Compile the XTTS GPT decoder with torch.compile (PyTorch 2.0+)
+        self.compile = config.get('tts', {}).get('compile', False)
+
+        # Also write an 8-bit mu-law copy of each file for previews
+        self.preview_quality = config.get('tts', {}).get('preview_quality', False)
+
         # Get model name for the language
         models = config.get('tts', {}).get('models', self.MODELS)
 
@@ -41,15 +119,55 @@ class TTSGenerator:
         else:
             self.model_name = models.get(self.language, self.MODELS.get(self.language, self.MODELS['multilingual']))
 
+        # Reference recording of the voice to clone (XTTS and other
+        # voice-cloning models)
+        self.speaker_wav = config.get('tts', {}).get('speaker_wav')
+
+        # Per-call synthesis arguments, resolved once
+        # Multilingual models (XTTS) need the language on every call
+        self._is_xtts = "xtts" in self.model_name.lower()
+        self._synthesis_kwargs = {'language': self.language} if self._is_xtts else {}
+        if self.speaker_wav and not self._is_xtts:
+            self._synthesis_kwargs['speaker_wav'] = self.speaker_wav
+
         # Lazy initialization - TTS model will be loaded on first use
         self.tts = None
+        self._device = None
+
+        # XTTS speaker conditioning (gpt_cond_latent, speaker_embedding),
+        # computed once from speaker_wav
+        self._speaker_latents = None
+        self._init_lock = threading.Lock()
 
     def _initialize_tts(self):
-        """Initialize TTS model (lazy loading)"""
-        if self.tts is None:
+        """Initialize TTS model (lazy loading, shared across generators)"""
+        if self.tts is not None:
+            return
+
+        # A call made while prewarm() is loading waits for that load
+        # instead of starting a second one
+        with self._init_lock:
+            if self.tts is not None:
+                return
+
             try:
                 from TTS.api import TTS
-                self.tts = TTS(model_name=self.model_name)
+                device = self._resolve_device()
+                key = (self.model_name, device, self.precision, self.compile)
+
+                with _MODEL_CACHE_LOCK:
+                    tts = _MODEL_CACHE.get(key)
+                    if tts is None:
+                        tts = TTS(model_name=self.model_name).to(device)
+                        self._apply_precision(tts, device)
+                        self._compile_model(tts)
+                        _MODEL_CACHE[key] = tts
+
+                self._device = device
+                if self._is_xtts and self.speaker_wav:
+                    self._speaker_latents = self._compute_speaker_latents(tts)
+
+                self.tts = tts
             except ImportError:
                 raise ImportError(
                     "TTS library not installed. "
@@ -58,25 +176,184 @@ class TTSGenerator:
             except Exception as e:
                 raise RuntimeError(f"Failed to initialize TTS model: {e}")
 
-    def generate(self, scene: Scene, output_dir: str) -> str:
+    def prewarm(self) -> threading.Thread:
+        """
+        Start loading the TTS model in a background thread
+
+        Lets the model load overlap other pipeline work (scene parsing,
+        image scaling); the first generate call then waits only for
+        whatever part of the load is still running.
+
+        Returns:
+            The started daemon thread (join it to wait for the load)
+
+        Note:
+            Load errors are not raised from the thread; tts stays None
+            and the next generate call retries the load and raises
+        """
+        def load():
+            try:
+                self._initialize_tts()
+            except Exception:
+                pass
+
+        thread = threading.Thread(target=load, name='tts-prewarm', daemon=True)
+        thread.start()
+        return thread
+
+    @classmethod
+    def preload(cls, config: dict) -> "TTSGenerator":
+        """
+        Load the configured TTS model into the shared cache ahead of use
+
+        Args:
+            config: Configuration dictionary with TTS settings
+
+        Returns:
+            Generator with the model already loaded
+        """
+        generator = cls(config)
+        generator._initialize_tts()
+        return generator
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop all shared TTS models (e.g. for test teardown or to free memory)"""
+        with _MODEL_CACHE_LOCK:
+            _MODEL_CACHE.clear()
+
+    def _resolve_device(self) -> str:
+        """
+        Resolve the configured inference device
+
+        Returns:
+            Torch device name ('cuda' if available when set to 'auto')
+        """
+        if self.device != 'auto':
+            return self.device
+
+        try:
+            import torch
+            return 'cuda' if torch.cuda.is_available() else 'cpu'
+        except ImportError:
+            return 'cpu'
+
+    def _apply_precision(self, tts, device: str) -> None:
+        """
+        Convert the synthesis model weights for the requested precision
+
+        Args:
+            tts: Loaded TTS API object
+            device: Device the model runs on
+
+        Note:
+            Dynamic int8 quantization of Linear layers is CPU-only.
+            bf16 weights are used on GPUs that support bfloat16 (its
+            fp32-sized exponent avoids fp16 overflow in attention);
+            fp16 keeps fp32 weights and relies on autocast. Otherwise
+            the model is left in full precision
+        """
+        if self.precision == 'int8' and device == 'cpu':
+            import torch
+            synthesizer = tts.synthesizer
+            synthesizer.tts_model = torch.quantization.quantize_dynamic(
+                synthesizer.tts_model,
+                {torch.nn.Linear},
+                dtype=torch.qint8
+            )
+        elif self.precision == 'bf16' and device.startswith('cuda'):
+            import torch
+            if torch.cuda.is_bf16_supported():
+                synthesizer = tts.synthesizer
+                synthesizer.tts_model = synthesizer.tts_model.to(dtype=torch.bfloat16)
+
+    def _compile_model(self, tts) -> None:
+        """
+        Compile the XTTS autoregressive GPT decoder when enabled
+
+        Args:
+            tts: Loaded TTS API object
+
+        Note:
+            dynamic=True keeps varying text lengths from triggering a
+            recompile per scene. Compilation itself happens lazily on the
+            first generate call. Skipped for non-XTTS models and for
+            torch versions without torch.compile
+        """
+        if not self.compile or not self._is_xtts:
+            return
+
+        import torch
+        if not hasattr(torch, 'compile'):
+            return
+
+        tts_model = tts.synthesizer.tts_model
+        tts_model.gpt = torch.compile(tts_model.gpt, mode='reduce-overhead', dynamic=True)
+
+    def _compute_speaker_latents(self, tts) -> Tuple[object, object]:
+        """
+        Encode the reference recording into XTTS conditioning latents
+
+        Args:
+            tts: Loaded TTS API object
+
+        Returns:
+            Tuple of (gpt_cond_latent, speaker_embedding)
+
+        Note:
+            tts_to_file re-encodes speaker_wav on every call; computing
+            the latents once lets generate skip that step per scene
+        """
+        with self._inference_context():
+            return tts.synthesizer.tts_model.get_conditioning_latents(
+                audio_path=[self.speaker_wav]
+            )
+
+    def _inference_context(self):
+        """
+        Get the context manager to run inference under
+
+        Returns:
+            Autocast context for fp16/bf16 on GPU, otherwise a no-op context
+        """
+        if self._device.startswith('cuda') and self.precision in ('fp16', 'bf16'):
+            import torch
+            if self.precision == 'fp16':
+                return torch.autocast(device_type='cuda', dtype=torch.float16)
+            if torch.cuda.is_bf16_supported():
+                return torch.autocast(device_type='cuda', dtype=torch.bfloat16)
+
+        return contextlib.nullcontext()
+
+    def generate(self, scene: Scene, output_dir: str, _ensure_dir: bool = True) -> str:
         """
         Generate audio for a scene
 
         Args:
             scene: Scene object containing text to convert
             output_dir: Directory to save the audio file
+            _ensure_dir: Create output_dir if needed (batch_generate creates
+                it once up front and skips the per-scene check)
 
         Returns:
             Path to the generated audio file
 
         Raises:
             RuntimeError: If TTS generation fails
+
+        Note:
+            Also sets scene.duration from the in-memory waveform, so the
+            file does not need to be read back to measure it
+
+            With tts.preview_quality a mu-law copy is written next to the
+            file as scene_XXX_audio_preview.wav
         """
         # Ensure TTS is initialized
         self._initialize_tts()
 
         # Create output directory if it doesn't exist
-        os.makedirs(output_dir, exist_ok=True)
+        if _ensure_dir:
+            os.makedirs(output_dir, exist_ok=True)
 
         # Generate output filename
         output_filename = f"scene_{scene.id:03d}_audio.wav"
@@ -84,18 +361,31 @@ class TTSGenerator:
 
         try:
             # Generate speech
-            # Check if model is multilingual (XTTS)
-            if "xtts" in self.model_name.lower():
-                self.tts.tts_to_file(
-                    text=scene.text,
-                    file_path=output_path,
-                    language=self.language
-                )
-            else:
-                self.tts.tts_to_file(
-                    text=scene.text,
-                    file_path=output_path
-                )
+            with self._inference_context():
+                if self._speaker_latents is not None:
+                    # XTTS with precomputed speaker conditioning; split into
+                    # sentences like tts() does, since a whole paragraph can
+                    # exceed the per-language character limit
+                    gpt_cond_latent, speaker_embedding = self._speaker_latents
+                    output = self.tts.synthesizer.tts_model.inference(
+                        scene.text,
+                        self.language,
+                        gpt_cond_latent,
+                        speaker_embedding,
+                        speed=self.speed,
+                        enable_text_splitting=True
+                    )
+                    wav = output['wav']
+                    self._write_wav(output_path, wav, self.tts.synthesizer.output_sample_rate)
+                else:
+                    # Same steps as tts_to_file, keeping the waveform in hand
+                    wav = self.tts.tts(text=scene.text, **self._synthesis_kwargs)
+                    self.tts.synthesizer.save_wav(wav=wav, path=output_path)
+
+            scene.duration = len(wav) / float(self.tts.synthesizer.output_sample_rate)
+
+            if self.preview_quality:
+                self._write_preview(output_path)
 
             return output_path
 
@@ -104,6 +394,92 @@ class TTSGenerator:
                 f"Failed to generate audio for scene {scene.id}: {e}"
             )
 
+    @staticmethod
+    def _write_wav(path: str, samples, sample_rate: int) -> None:
+        """
+        Write a float waveform as a 16-bit mono PCM WAV file
+
+        Args:
+            path: Output file path
+            samples: Waveform with values in [-1.0, 1.0]
+            sample_rate: Sample rate in Hz
+        """
+        pcm = (np.clip(np.asarray(samples, dtype=np.float32), -1.0, 1.0) * 32767).astype('<i2')
+
+        with wave.open(path, 'wb') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(sample_rate)
+            wav_file.writeframes(pcm.tobytes())
+
+    def _write_preview(self, audio_path: str) -> str:
+        """
+        Write an 8-bit mu-law preview copy of a generated 16-bit WAV file
+
+        Args:
+            audio_path: Path to the 16-bit PCM WAV file
+
+        Returns:
+            Path to the preview file (<name>_preview.wav)
+
+        Raises:
+            ValueError: If the source is not 16-bit PCM
+        """
+        with wave.open(audio_path, 'rb') as wav_file:
+            if wav_file.getsampwidth() != 2:
+                raise ValueError(f"Preview needs 16-bit PCM audio: {audio_path}")
+
+            channels = wav_file.getnchannels()
+            sample_rate = wav_file.getframerate()
+            samples = np.frombuffer(wav_file.readframes(wav_file.getnframes()), dtype='<i2')
+
+        root, ext = os.path.splitext(audio_path)
+        preview_path = f"{root}_preview{ext}"
+        self._write_quantized(preview_path, samples, sample_rate, channels)
+
+        return preview_path
+
+    @staticmethod
+    def _write_quantized(path: str, samples, sample_rate: int, channels: int = 1) -> None:
+        """
+        Write 16-bit samples as an 8-bit G.711 mu-law WAV file
+
+        Args:
+            path: Output file path
+            samples: Interleaved int16 samples
+            sample_rate: Sample rate in Hz
+            channels: Number of interleaved channels
+
+        Note:
+            Encoding is bit-exact with audioop.lin2ulaw (removed in Python
+            3.13). Half the bytes of 16-bit PCM; the canonical 44-byte
+            header keeps the get_audio_duration fast path working
+        """
+        pcm = np.asarray(samples, dtype=np.int32) >> 2
+        mask = np.where(pcm < 0, 0x7F, 0xFF)
+        magnitude = np.minimum(np.abs(pcm), 8159) + 0x21
+        segment = np.searchsorted(_MULAW_SEGMENT_ENDS, magnitude)
+        codes = np.where(
+            segment >= 8,
+            0x7F,
+            (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F)
+        )
+        data = (codes ^ mask).astype(np.uint8).tobytes()
+        # Chunks are padded to an even size
+        padding = b'\x00' * (len(data) & 1)
+
+        header = _WAV_HEADER.pack(
+            b'RIFF', 36 + len(data) + len(padding), b'WAVE',
+            b'fmt ', 16, _WAVE_FORMAT_MULAW, channels, sample_rate,
+            sample_rate * channels, channels, 8,
+            b'data', len(data)
+        )
+
+        with open(path, 'wb') as f:
+            f.write(header)
+            f.write(data)
+            f.write(padding)
+
     def get_audio_duration(self, audio_path: str) -> float:
         """
         Get duration of an audio file in seconds
@@ -122,6 +498,21 @@ class TTSGenerator:
             raise FileNotFoundError(f"Audio file not found: {audio_path}")
 
         try:
+            # Fast path: duration straight from a canonical 44-byte header
+            with open(audio_path, 'rb') as f:
+                header = f.read(_WAV_HEADER.size)
+
+            duration = self._parse_wav_header(header)
+            if duration is not None:
+                return duration
+
+            # Other layouts (extra chunks, extensible fmt): walk the RIFF
+            # chunk headers in a memory map
+            duration = self._scan_wav_chunks(audio_path)
+            if duration is not None:
+                return duration
+
+            # Not a RIFF/WAVE file we can walk: let the wave module report it
             with wave.open(audio_path, 'r') as wav_file:
                 frames = wav_file.getnframes()
                 rate = wav_file.getframerate()
@@ -131,6 +522,120 @@ class TTSGenerator:
         except Exception as e:
             raise RuntimeError(f"Failed to read audio file {audio_path}: {e}")
 
+    @staticmethod
+    def _parse_wav_header(header: bytes) -> Optional[float]:
+        """
+        Compute duration from a canonical PCM WAV header
+
+        Args:
+            header: First 44 bytes of the file
+
+        Returns:
+            Duration in seconds, or None if the header is not the canonical
+            RIFF/fmt/data layout
+        """
+        if len(header) < _WAV_HEADER.size:
+            return None
+
+        (riff, _, wave_id, fmt_id, fmt_size, _, _, rate, _,
+         block_align, _, data_id, data_size) = _WAV_HEADER.unpack(header)
+
+        if (riff != b'RIFF' or wave_id != b'WAVE' or fmt_id != b'fmt '
+                or fmt_size != 16 or data_id != b'data'
+                or rate == 0 or block_align == 0 or data_size == 0xFFFFFFFF):
+            return None
+
+        return (data_size // block_align) / float(rate)
+
+    @staticmethod
+    def _scan_wav_chunks(audio_path: str) -> Optional[float]:
+        """
+        Compute duration by walking the RIFF chunk headers of a WAV file
+
+        Args:
+            audio_path: Path to the WAV audio file
+
+        Returns:
+            Duration in seconds, or None if the file is not RIFF/WAVE or
+            lacks a usable fmt or data chunk
+
+        Note:
+            Only the 8-byte chunk headers and the fmt fields are read from
+            the map, so sample data is never paged in. Unlike the wave
+            module on Python < 3.12 this also accepts WAVE_FORMAT_EXTENSIBLE
+            files; a data chunk size past the end of the file (streamed or
+            truncated output) is clamped to the bytes actually present
+        """
+        with open(audio_path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size < 12:
+                return None
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm[0:4] != b'RIFF' or mm[8:12] != b'WAVE':
+                    return None
+
+                rate = block_align = None
+                offset = 12
+                end = len(mm)
+
+                while offset + 8 <= end:
+                    chunk_id = mm[offset:offset + 4]
+                    (chunk_size,) = struct.unpack_from('<I', mm, offset + 4)
+                    body = offset + 8
+
+                    if chunk_id == b'fmt ' and body + 14 <= end:
+                        (rate,) = struct.unpack_from('<I', mm, body + 4)
+                        (block_align,) = struct.unpack_from('<H', mm, body + 12)
+                    elif chunk_id == b'data':
+                        if not rate or not block_align:
+                            return None
+                        data_size = min(chunk_size, end - body)
+                        return (data_size // block_align) / float(rate)
+
+                    # Chunks are padded to an even size
+                    offset = body + chunk_size + (chunk_size & 1)
+
+        return None
+
+    def _resolve_workers(self) -> int:
+        """
+        Resolve the configured number of batch worker processes
+
+        Returns:
+            tts.workers, or for 'auto' one worker per GPU on CUDA and at
+            most _AUTO_CPU_WORKERS on CPU, since each worker loads its
+            own copy of the model
+        """
+        if self.workers != 'auto':
+            return self.workers
+
+        if self._resolve_device() == 'cuda':
+            import torch
+            return max(torch.cuda.device_count(), 1)
+
+        return min(os.cpu_count() or 1, _AUTO_CPU_WORKERS)
+
+    def _worker_devices(self, workers: int) -> Optional[List[str]]:
+        """
+        Assign a GPU to each batch worker process
+
+        Args:
+            workers: Number of worker processes
+
+        Returns:
+            Device name per worker (cuda:0, cuda:1, ... round-robin), or
+            None when inference does not run on more than one GPU
+        """
+        if self._resolve_device() != 'cuda':
+            return None
+
+        import torch
+        count = torch.cuda.device_count()
+        if count < 2:
+            return None
+
+        return [f'cuda:{rank % count}' for rank in range(workers)]
+
     def batch_generate(self, scenes: list[Scene], output_dir: str) -> None:
         """
         Generate audio for multiple scenes
@@ -140,13 +645,54 @@ class TTSGenerator:
             output_dir: Directory to save audio files
 
         Note:
-            This method updates each scene's audio_path and duration
+            This method updates each scene's audio_path and duration.
+            With tts.workers > 1 scenes are distributed across worker
+            processes, each loading its own copy of the TTS model. On
+            multi-GPU hosts the workers are spread round-robin across
+            the GPUs.
         """
+        if not scenes:
+            return
+
+        workers = min(self._resolve_workers(), len(scenes))
+
+        # Create the shared output directory once instead of per scene
+        os.makedirs(output_dir, exist_ok=True)
+
+        if workers > 1:
+            # spawn: forked children cannot safely reuse torch/CUDA state
+            context = multiprocessing.get_context('spawn')
+
+            worker_devices = self._worker_devices(workers)
+            devices = None
+            if worker_devices is not None:
+                devices = context.Queue()
+                for device in worker_devices:
+                    devices.put(device)
+
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=context,
+                initializer=_init_worker,
+                initargs=(self.config, devices)
+            ) as executor:
+                results = executor.map(
+                    _generate_in_worker,
+                    [scene.id for scene in scenes],
+                    [scene.text for scene in scenes],
+                    [output_dir] * len(scenes)
+                )
+                for scene, (audio_path, duration) in zip(scenes, results):
+                    scene.audio_path = audio_path
+                    scene.duration = duration
+            return
+
         for scene in scenes:
-            # Generate audio
-            audio_path = self.generate(scene, output_dir)
+            # Generate audio (sets the duration from the waveform)
+            scene.duration = 0.0
+            audio_path = self.generate(scene, output_dir, _ensure_dir=False)
             scene.audio_path = audio_path
 
-            # Calculate and set duration
-            duration = self.get_audio_duration(audio_path)
-            scene.duration = duration
+            # Fall back to the file header if the duration was not set
+            if scene.duration <= 0:
+                scene.duration = self.get_audio_duration(audio_path)
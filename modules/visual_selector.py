@@ -3,14 +3,27 @@ Visual Selector Module
 Handles image selection and scaling for video scenes
 """
 
+import hashlib
 import os
 import random
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Tuple
+from typing import Dict, List, Tuple
+import numpy as np
 from PIL import Image
 from modules.scene_parser import Scene
 
 
+# EXIF tag holding the display rotation/mirroring of a photo
+_EXIF_ORIENTATION = 0x0112
+
+# Large downscales first box-reduce to within this factor of the target,
+# then run Lanczos on the smaller image (output indistinguishable)
+_REDUCING_GAP = 3.0
+
+
 class VisualSelector:
     """
     Selector for choosing and processing images for video scenes
@@ -18,6 +31,7 @@ class VisualSelector:
 
     # Supported image formats
     SUPPORTED_FORMATS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+    _SUPPORTED_EXTENSIONS = frozenset(SUPPORTED_FORMATS)
 
     def __init__(self, config: dict):
         """
@@ -33,11 +47,32 @@ class VisualSelector:
         self.images_dir = visuals_config.get('images_dir', './assets/images')
         self.default_duration = visuals_config.get('default_duration', 5)
 
+        # Resize backend: pillow | vips | opencv (optional pyvips /
+        # opencv-python-headless dependency)
+        self.resize_backend = visuals_config.get('resize_backend', 'pillow')
+
+        # JPEG quality of scaled images; they are intermediate frames that
+        # the video codec re-encodes, so 85 with 4:2:0 is visually lossless
+        self.jpeg_quality = visuals_config.get('jpeg_quality', 85)
+
         # Get target resolution from config
         resolution = video_config.get('resolution', {})
         self.target_width = resolution.get('width', 1920)
         self.target_height = resolution.get('height', 1080)
 
+        # Persistent store of scaled images shared by all output
+        # directories (and runs); None keeps results only in output_dir
+        cache_dir = config.get('paths', {}).get('cache_dir')
+        self.cache_dir = os.path.join(cache_dir, 'images') if cache_dir else None
+
+        # Size bound of that store; least recently used images are evicted
+        # past it (0 or None: unbounded)
+        cache_max_size_mb = config.get('paths', {}).get('cache_max_size_mb', 1024)
+        self.cache_max_bytes = int(cache_max_size_mb * 1024 * 1024) if cache_max_size_mb else None
+
+        # Image listings keyed by absolute directory: (mtime, files)
+        self._dir_cache: Dict[str, Tuple[int, List[str]]] = {}
+
     def select_image(self, scene: Scene, images_dir: str = None) -> str:
         """
         Select a random image from the images directory
@@ -83,17 +118,33 @@ class VisualSelector:
 
         Returns:
             List of full paths to image files
+
+        Note:
+            Listings are cached per directory; adding or removing files
+            updates the directory mtime and triggers a fresh scan
         """
+        key = os.path.abspath(directory)
+        mtime = os.stat(directory).st_mtime_ns
+        cached = self._dir_cache.get(key)
+        if cached is not None and cached[0] == mtime:
+            return list(cached[1])
+
         image_files = []
 
-        for filename in os.listdir(directory):
-            filepath = os.path.join(directory, filename)
+        # scandir entries carry the file type, so no extra stat per file
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                _, dot, extension = entry.name.rpartition('.')
 
-            # Check if it's a file and has supported extension
-            if os.path.isfile(filepath) and filename.lower().endswith(self.SUPPORTED_FORMATS):
-                image_files.append(filepath)
+                # Check if it has supported extension and is a file
+                if dot and f".{extension.lower()}" in self._SUPPORTED_EXTENSIONS and entry.is_file():
+                    image_files.append(entry.path)
 
-        return sorted(image_files)  # Sort for consistent ordering
+        image_files.sort()  # Sort for consistent ordering
+        # Replaces any stale listing, so one entry per directory is kept
+        self._dir_cache[key] = (mtime, image_files)
+
+        return list(image_files)
 
     def scale_image(
         self,
@@ -116,12 +167,23 @@ class VisualSelector:
             FileNotFoundError: If source image doesn't exist
             RuntimeError: If image processing fails
 
+        Note:
+            Results are cached in output_dir: a source that has not changed
+            since it was last scaled to the same resolution is not
+            processed again. With paths.cache_dir set, results are also
+            kept there and linked (or copied) into any output_dir, so a
+            fresh temp directory does not trigger a rescale. That store is
+            trimmed to paths.cache_max_size_mb, least recently used first
+
         Algorithm:
             1. Calculate aspect ratios of source and target
             2. Resize image so that it covers target area
             3. Crop center to exact target dimensions
         """
-        if not os.path.exists(image_path):
+        # One stat serves both the existence check and the cache key
+        try:
+            image_stat = os.stat(image_path)
+        except FileNotFoundError:
             raise FileNotFoundError(f"Image not found: {image_path}")
 
         if target_resolution is None:
@@ -129,62 +191,452 @@ class VisualSelector:
 
         target_width, target_height = target_resolution
 
+        # Generate output filename
+        if output_dir is None:
+            output_dir = os.path.join(os.path.dirname(image_path), 'scaled')
+
+        name, ext = os.path.splitext(os.path.basename(image_path))
+        cache_key = self._cache_key(image_path, image_stat, target_width, target_height)
+        output_filename = f"{name}_scaled_{target_width}x{target_height}_{cache_key}{ext}"
+        output_path = os.path.join(output_dir, output_filename)
+
+        # Reuse a previous result for the same unchanged source and settings
+        if os.path.exists(output_path):
+            return output_path
+
         try:
-            # Open image
-            img = Image.open(image_path)
+            os.makedirs(output_dir, exist_ok=True)
 
-            # Convert to RGB if necessary (handles RGBA, grayscale, etc.)
-            if img.mode != 'RGB':
-                img = img.convert('RGB')
+            if self.cache_dir is None:
+                self._render(image_path, target_width, target_height, output_path)
+            else:
+                cache_path = os.path.join(self.cache_dir, output_filename)
+                if os.path.exists(cache_path):
+                    # Mark as recently used for eviction
+                    os.utime(cache_path)
+                    self._publish(cache_path, output_path)
+                else:
+                    os.makedirs(self.cache_dir, exist_ok=True)
+                    self._render(image_path, target_width, target_height, cache_path)
+                    self._publish(cache_path, output_path)
+                    self._evict_cache()
 
-            # Get original dimensions
-            orig_width, orig_height = img.size
+            return output_path
+
+        except ImportError:
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Failed to scale image {image_path}: {e}")
 
-            # Calculate aspect ratios
-            orig_aspect = orig_width / orig_height
-            target_aspect = target_width / target_height
+    def _render(
+        self,
+        image_path: str,
+        target_width: int,
+        target_height: int,
+        output_path: str
+    ) -> None:
+        """
+        Scale an image with the configured backend and save it atomically
+
+        Args:
+            image_path: Path to source image
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+            output_path: Path to save scaled image
+        """
+        # Write to a temporary file and move it into place, so an
+        # interrupted run never leaves a partial file in the cache
+        ext = os.path.splitext(output_path)[1]
+        fd, temp_path = tempfile.mkstemp(suffix=ext, dir=os.path.dirname(output_path))
+        os.close(fd)
 
-            # Determine resize dimensions (cover the target area)
-            if orig_aspect > target_aspect:
-                # Image is wider - match height and crop width
-                new_height = target_height
-                new_width = int(target_height * orig_aspect)
+        try:
+            if self.resize_backend == 'vips':
+                self._scale_with_vips(image_path, target_width, target_height, temp_path)
+            elif self.resize_backend == 'opencv':
+                self._scale_with_opencv(image_path, target_width, target_height, temp_path)
             else:
-                # Image is taller - match width and crop height
-                new_width = target_width
-                new_height = int(target_width / orig_aspect)
+                self._scale_with_pillow(image_path, target_width, target_height, temp_path)
+
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
 
-            # Resize image
-            img_resized = img.resize((new_width, new_height), Image.Resampling.LANCZOS)
+    def _publish(self, cache_path: str, output_path: str) -> None:
+        """
+        Make a cached scaled image available at output_path
+
+        Args:
+            cache_path: Scaled image in the persistent cache
+            output_path: Path the caller expects the image at
+
+        Note:
+            Hard links cost no copy; across filesystems (or where links
+            are unsupported) the file is copied and moved into place
+        """
+        try:
+            os.link(cache_path, output_path)
+            return
+        except FileExistsError:
+            return
+        except OSError:
+            pass
+
+        ext = os.path.splitext(output_path)[1]
+        fd, temp_path = tempfile.mkstemp(suffix=ext, dir=os.path.dirname(output_path))
+        os.close(fd)
+
+        try:
+            shutil.copyfile(cache_path, temp_path)
+            os.replace(temp_path, output_path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def _evict_cache(self) -> None:
+        """
+        Remove least recently used images until the cache fits its bound
+
+        Note:
+            Runs after a new image is published, so removing any entry
+            (including the newest) never affects the caller's output;
+            published hard links keep their data. Files vanishing under a
+            concurrent eviction are skipped
+        """
+        if self.cache_max_bytes is None:
+            return
+
+        entries = []
+        total = 0
+        with os.scandir(self.cache_dir) as it:
+            for entry in it:
+                # Skip in-progress temporary renders
+                if '_scaled_' not in entry.name or not entry.is_file():
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                total += stat.st_size
+
+        if total <= self.cache_max_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.cache_max_bytes:
+                break
+
+    def _cache_key(
+        self,
+        image_path: str,
+        image_stat: os.stat_result,
+        target_width: int,
+        target_height: int
+    ) -> str:
+        """
+        Build the cache key for a scaled image
+
+        Args:
+            image_path: Path to source image
+            image_stat: Result of os.stat on the source image
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+
+        Returns:
+            Hex digest of source location, modification time, target size,
+            resize backend and JPEG quality
+        """
+        key = (
+            f"{os.path.realpath(image_path)}:{image_stat.st_mtime_ns}:{image_stat.st_size}:"
+            f"{target_width}x{target_height}:{self.resize_backend}:q{self.jpeg_quality}"
+        )
+
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=8).hexdigest()
+
+    def _scale_with_pillow(
+        self,
+        image_path: str,
+        target_width: int,
+        target_height: int,
+        output_path: str
+    ) -> None:
+        """
+        Crop-to-fit scale an image with Pillow
 
-            # Calculate crop coordinates (center crop)
-            left = (new_width - target_width) // 2
-            top = (new_height - target_height) // 2
+        Args:
+            image_path: Path to source image
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+            output_path: Path to save scaled image
+        """
+        # Open image
+        img = Image.open(image_path)
+
+        # Already the target size and format: copy the file instead of a
+        # lossy decode/re-encode round trip (header fields only, no pixel
+        # decode; skipped if EXIF rotation would change how it displays)
+        extension = os.path.splitext(output_path)[1].lower()
+        if (img.size == (target_width, target_height) and img.mode == 'RGB'
+                and Image.registered_extensions().get(extension) == img.format
+                and img.getexif().get(_EXIF_ORIENTATION, 1) == 1):
+            img.close()
+            shutil.copyfile(image_path, output_path)
+            return
+
+        img = self._decode_rgb(img, target_width, target_height)
+
+        # Get original dimensions
+        orig_width, orig_height = img.size
+
+        # Calculate aspect ratios
+        orig_aspect = orig_width / orig_height
+        target_aspect = target_width / target_height
+
+        if abs(orig_aspect - target_aspect) < 1e-3:
+            # Aspect ratios match: no crop needed
+            factor = orig_width // target_width
+
+            if factor > 1 and (orig_width, orig_height) == (target_width * factor, target_height * factor):
+                # Exact integer multiple: box-average reduce is much cheaper than Lanczos
+                img_cropped = img.reduce(factor)
+            elif (orig_width, orig_height) == (target_width, target_height):
+                img_cropped = img
+            else:
+                img_cropped = img.resize(
+                    (target_width, target_height),
+                    Image.Resampling.LANCZOS,
+                    reducing_gap=_REDUCING_GAP
+                )
+        else:
+            new_width, new_height, left, top = self._plan_crop(
+                orig_width, orig_height, target_width, target_height
+            )
             right = left + target_width
             bottom = top + target_height
 
-            # Crop to target dimensions
-            img_cropped = img_resized.crop((left, top, right, bottom))
+            # Resize only the source region that survives the crop, mapped
+            # back to source coordinates: same pixels as resize-then-crop,
+            # without allocating the full-size resized intermediate
+            x_scale = orig_width / new_width
+            y_scale = orig_height / new_height
+            img_cropped = img.resize(
+                (target_width, target_height),
+                Image.Resampling.LANCZOS,
+                box=(left * x_scale, top * y_scale, right * x_scale, bottom * y_scale),
+                reducing_gap=_REDUCING_GAP
+            )
 
-            # Generate output filename
-            if output_dir is None:
-                output_dir = os.path.join(os.path.dirname(image_path), 'scaled')
+        self._save_scaled(img_cropped, output_path)
 
-            os.makedirs(output_dir, exist_ok=True)
+    def _scale_with_opencv(
+        self,
+        image_path: str,
+        target_width: int,
+        target_height: int,
+        output_path: str
+    ) -> None:
+        """
+        Crop-to-fit scale an image with OpenCV
 
-            # Create output filename
-            base_name = os.path.basename(image_path)
-            name, ext = os.path.splitext(base_name)
-            output_filename = f"{name}_scaled_{target_width}x{target_height}{ext}"
-            output_path = os.path.join(output_dir, output_filename)
+        Decoding (with JPEG draft) and encoding stay in Pillow; only the
+        resample runs in cv2.resize, which is SIMD-vectorized and
+        multi-threaded. INTER_AREA is used for downscales, Lanczos for
+        upscales.
 
-            # Save scaled image
-            img_cropped.save(output_path, quality=95)
+        Args:
+            image_path: Path to source image
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+            output_path: Path to save scaled image
 
-            return output_path
+        Raises:
+            ImportError: If OpenCV is not installed
+        """
+        try:
+            import cv2
+        except ImportError:
+            raise ImportError(
+                "OpenCV library not installed. "
+                "Install with: pip install opencv-python-headless"
+            )
 
-        except Exception as e:
-            raise RuntimeError(f"Failed to scale image {image_path}: {e}")
+        img = self._decode_rgb(Image.open(image_path), target_width, target_height)
+        orig_width, orig_height = img.size
+
+        new_width, new_height, left, top = self._plan_crop(
+            orig_width, orig_height, target_width, target_height
+        )
+
+        if new_width < orig_width:
+            interpolation = cv2.INTER_AREA
+        else:
+            interpolation = cv2.INTER_LANCZOS4
+
+        resized = cv2.resize(np.asarray(img), (new_width, new_height), interpolation=interpolation)
+        cropped = resized[top:top + target_height, left:left + target_width]
+
+        self._save_scaled(Image.fromarray(np.ascontiguousarray(cropped)), output_path)
+
+    @staticmethod
+    def _plan_crop(
+        orig_width: int,
+        orig_height: int,
+        target_width: int,
+        target_height: int
+    ) -> Tuple[int, int, int, int]:
+        """
+        Plan a crop-to-fit: cover the target area, then center crop
+
+        Args:
+            orig_width: Source width in pixels
+            orig_height: Source height in pixels
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+
+        Returns:
+            Tuple of (new_width, new_height, left, top): the cover size and
+            the offset of the target-sized crop within it
+        """
+        orig_aspect = orig_width / orig_height
+
+        # Determine resize dimensions (cover the target area); max() keeps
+        # float truncation from leaving the cover a pixel short
+        if orig_aspect > target_width / target_height:
+            # Image is wider - match height and crop width
+            new_width = max(target_width, int(target_height * orig_aspect))
+            new_height = target_height
+        else:
+            # Image is taller - match width and crop height
+            new_width = target_width
+            new_height = max(target_height, int(target_width / orig_aspect))
+
+        # Calculate crop coordinates (center crop)
+        return new_width, new_height, (new_width - target_width) // 2, (new_height - target_height) // 2
+
+    @staticmethod
+    def _decode_rgb(img: Image.Image, target_width: int, target_height: int) -> Image.Image:
+        """
+        Decode an opened image as RGB, as small as the target allows
+
+        Args:
+            img: Opened (not yet loaded) image
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+
+        Returns:
+            RGB image
+        """
+        # Let libjpeg decode at a reduced DCT scale (1/2, 1/4 or 1/8) that
+        # still leaves 2x headroom over the target for the Lanczos filter;
+        # no-op for other formats
+        if img.format == 'JPEG':
+            img.draft('RGB', (target_width * 2, target_height * 2))
+
+        # Convert to RGB if necessary (handles RGBA, grayscale, etc.)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+
+        return img
+
+    def _save_scaled(self, img: Image.Image, output_path: str) -> None:
+        """
+        Save a scaled image with fast encoder settings
+
+        These are intermediate frames, re-encoded later by the video codec
+
+        Args:
+            img: Scaled RGB image
+            output_path: Path to save scaled image
+        """
+        extension = os.path.splitext(output_path)[1].lower()
+        if extension in ('.jpg', '.jpeg'):
+            # Single-pass baseline JPEG with 4:2:0 chroma subsampling
+            img.save(
+                output_path, 'JPEG',
+                quality=self.jpeg_quality, optimize=False, progressive=False, subsampling=2
+            )
+        elif extension == '.png':
+            img.save(output_path, 'PNG', compress_level=1)
+        else:
+            img.save(output_path, quality=95)
+
+    def _scale_with_vips(
+        self,
+        image_path: str,
+        target_width: int,
+        target_height: int,
+        output_path: str
+    ) -> None:
+        """
+        Crop-to-fit scale an image with libvips
+
+        thumbnail() fuses decode (with shrink-on-load for JPEG), resize
+        and centre crop into one streaming pipeline: the source is opened
+        with sequential access and flows through in strips, so the
+        full-size raster is never held in memory.
+
+        Args:
+            image_path: Path to source image
+            target_width: Target width in pixels
+            target_height: Target height in pixels
+            output_path: Path to save scaled image
+
+        Raises:
+            ImportError: If pyvips is not installed
+
+        Note:
+            Formats libvips has no saver for (e.g. BMP without ImageMagick
+            support) are scaled with Pillow instead
+        """
+        try:
+            import pyvips
+        except ImportError:
+            raise ImportError(
+                "pyvips library not installed. "
+                "Install with: pip install pyvips"
+            )
+
+        # Output keeps the source extension; every built-in libvips saver
+        # has a matching loader, so one check covers both directions
+        if os.path.splitext(output_path)[1].lower() not in pyvips.get_suffixes():
+            self._scale_with_pillow(image_path, target_width, target_height, output_path)
+            return
+
+        img = pyvips.Image.thumbnail(
+            image_path,
+            target_width,
+            height=target_height,
+            size='both',
+            crop='centre'
+        )
+
+        # Match the Pillow path: 3-band sRGB output
+        if img.interpretation != 'srgb':
+            img = img.colourspace('srgb')
+        if img.bands > 3:
+            img = img.extract_band(0, n=3)
+
+        # Drop EXIF/ICC/XMP like the Pillow path does; 'keep' replaced
+        # 'strip' in libvips 8.15
+        if pyvips.at_least_libvips(8, 15):
+            save_options = {'keep': 'none'}
+        else:
+            save_options = {'strip': True}
+
+        # Quality only applies to lossy formats
+        if output_path.lower().endswith(('.jpg', '.jpeg')):
+            save_options['Q'] = self.jpeg_quality
+        elif output_path.lower().endswith('.webp'):
+            save_options['Q'] = 95
+
+        img.write_to_file(output_path, **save_options)
 
     def batch_process(
         self,
@@ -201,20 +653,32 @@ class VisualSelector:
             output_dir: Directory to save scaled images
 
         Note:
-            This method updates each scene's image_path
+            This method updates each scene's image_path. Images are
+            scaled concurrently in a thread pool.
         """
         if output_dir is None:
             output_dir = os.path.join(self.config.get('paths', {}).get('temp_dir', './temp'), 'images')
 
-        for scene in scenes:
-            # Select image
-            image_path = self.select_image(scene, images_dir)
+        if not scenes:
+            return
+
+        # Select images up front (keeps random selection order deterministic)
+        selected = [self.select_image(scene, images_dir) for scene in scenes]
 
-            # Scale image
-            scaled_image_path = self.scale_image(image_path, output_dir=output_dir)
+        # Scale each distinct source once; Pillow releases the GIL while
+        # decoding, resizing and encoding, so threads run in parallel
+        sources = list(dict.fromkeys(selected))
+        workers = min(len(sources), os.cpu_count() or 1)
 
-            # Update scene
-            scene.image_path = scaled_image_path
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            scaled = dict(zip(
+                sources,
+                executor.map(lambda path: self.scale_image(path, output_dir=output_dir), sources)
+            ))
+
+        # Update scenes
+        for scene, image_path in zip(scenes, selected):
+            scene.image_path = scaled[image_path]
 
     def get_image_info(self, image_path: str) -> dict:
         """
@@ -229,17 +693,21 @@ class VisualSelector:
         Raises:
             FileNotFoundError: If image doesn't exist
         """
-        if not os.path.exists(image_path):
+        # One stat serves both the existence check and the file size
+        try:
+            image_stat = os.stat(image_path)
+        except FileNotFoundError:
             raise FileNotFoundError(f"Image not found: {image_path}")
 
         try:
+            # Image.open only parses the header; pixels are never decoded
             with Image.open(image_path) as img:
                 return {
                     'width': img.width,
                     'height': img.height,
                     'format': img.format,
                     'mode': img.mode,
-                    'size': os.path.getsize(image_path)
+                    'size': image_stat.st_size
                 }
         except Exception as e:
             raise RuntimeError(f"Failed to get image info: {e}")
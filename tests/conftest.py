@@ -0,0 +1,42 @@
+"""
+Shared pytest fixtures
+"""
+
+import pytest
+from pathlib import Path
+from pydub import AudioSegment
+import modules.music_selector
+
+
+def pytest_configure(config):
+    """Register custom markers"""
+    config.addinivalue_line(
+        "markers",
+        "no_audio: replace audio exports with a stub for tests that never inspect the exported audio"
+    )
+
+
+@pytest.fixture
+def fake_export(monkeypatch):
+    """Replace audio exports with a stub writing a 1-byte sentinel (no ffmpeg encode)"""
+    def export(self, out_f=None, format='mp3', **kwargs):
+        if hasattr(out_f, 'write'):
+            out_f.write(b"\x00")
+            out_f.seek(0)
+            return out_f
+
+        Path(out_f).write_bytes(b"\x00")
+        return out_f
+
+    monkeypatch.setattr(AudioSegment, 'export', export)
+    monkeypatch.setattr(
+        modules.music_selector, '_ffmpeg_encode',
+        lambda audio, output_path, audio_format: Path(output_path).write_bytes(b"\x00")
+    )
+
+
+@pytest.fixture(autouse=True)
+def _apply_no_audio_marker(request):
+    """Use fake_export for tests marked with no_audio"""
+    if request.node.get_closest_marker('no_audio') is not None:
+        request.getfixturevalue('fake_export')
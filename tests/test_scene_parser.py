@@ -3,6 +3,7 @@ Tests for Scene Parser Module
 """
 
 import pytest
+import sys
 from pathlib import Path
 from modules.scene_parser import Scene, SceneParser
 
@@ -40,6 +41,12 @@ class TestScene:
         assert scene.image_path == "/path/to/image.jpg"
         assert scene.metadata == {"key": "value"}
 
+    @pytest.mark.skipif(sys.version_info < (3, 10), reason="slots dataclasses need Python 3.10+")
+    def test_scene_uses_slots(self):
+        """Test that Scene instances have no per-instance __dict__"""
+        scene = Scene(id=1, text="Test text")
+        assert not hasattr(scene, '__dict__')
+
 
 class TestSceneParser:
     """Tests for SceneParser class"""
@@ -71,6 +78,55 @@ class TestSceneParser:
         assert scenes[2].id == 3
         assert scenes[2].text == "Third paragraph."
 
+    def test_iter_scenes_is_lazy(self, tmp_path):
+        """Test that iter_scenes yields scenes one at a time"""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text(
+            "First paragraph.\n   \n"
+            "Second paragraph\nspanning lines.\n\n",
+            encoding='utf-8'
+        )
+
+        parser = SceneParser()
+        scenes = parser.iter_scenes(str(test_file))
+
+        first = next(scenes)
+        assert first.id == 1
+        assert first.text == "First paragraph."
+
+        second = next(scenes)
+        assert second.id == 2
+        assert second.text == "Second paragraph spanning lines."
+
+        with pytest.raises(StopIteration):
+            next(scenes)
+
+    def test_iter_scenes_validates_eagerly(self, tmp_path):
+        """Test that iter_scenes raises before iteration on bad input"""
+        parser = SceneParser()
+
+        with pytest.raises(FileNotFoundError):
+            parser.iter_scenes(str(tmp_path / "missing.txt"))
+
+    def test_parse_columnar(self, tmp_path):
+        """Test parsing into column-oriented scene data"""
+        test_file = tmp_path / "test.txt"
+        test_file.write_text(
+            "First paragraph.\n\n"
+            "Second paragraph.",
+            encoding='utf-8'
+        )
+
+        parser = SceneParser()
+        columns = parser.parse_columnar(str(test_file))
+
+        assert columns['id'].tolist() == [1, 2]
+        assert columns['text'] == ["First paragraph.", "Second paragraph."]
+        assert columns['duration'].tolist() == [0.0, 0.0]
+        assert columns['audio_path'] == [None, None]
+        assert columns['subtitle_path'] == [None, None]
+        assert columns['image_path'] == [None, None]
+
     def test_parse_with_empty_lines(self, tmp_path):
         """Test parsing text with empty lines"""
         test_file = tmp_path / "test.txt"
@@ -135,6 +191,17 @@ class TestSceneParser:
         assert len(scenes) == 1
         assert scenes[0].text == "Markdown content"
 
+    def test_parse_uppercase_extension(self, tmp_path):
+        """Test that file extensions are matched case-insensitively"""
+        test_file = tmp_path / "SCRIPT.TXT"
+        test_file.write_text("Upper case extension", encoding='utf-8')
+
+        parser = SceneParser()
+        scenes = parser.parse(str(test_file))
+
+        assert len(scenes) == 1
+        assert scenes[0].text == "Upper case extension"
+
     def test_parse_nonexistent_file(self):
         """Test parsing a file that doesn't exist"""
         parser = SceneParser()
@@ -142,6 +209,16 @@ class TestSceneParser:
         with pytest.raises(FileNotFoundError):
             parser.parse("/nonexistent/file.txt")
 
+    def test_parse_directory_raises_file_not_found(self, tmp_path):
+        """Test that a directory with a script-like name is rejected up front"""
+        directory = tmp_path / "script.txt"
+        directory.mkdir()
+
+        parser = SceneParser()
+
+        with pytest.raises(FileNotFoundError, match="File not found"):
+            parser.parse(str(directory))
+
     def test_parse_unsupported_format(self, tmp_path):
         """Test parsing unsupported file format"""
         test_file = tmp_path / "test.pdf"
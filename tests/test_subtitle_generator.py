@@ -7,7 +7,7 @@ import os
 import pysrt
 from pathlib import Path
 from modules.scene_parser import Scene
-from modules.subtitle_generator import SubtitleGenerator
+from modules.subtitle_generator import SubtitleGenerator, parse_srt
 
 
 class TestSubtitleGenerator:
@@ -38,6 +38,7 @@ class TestSubtitleGenerator:
         generator = SubtitleGenerator(config)
         assert generator.enabled is True
         assert generator.max_chars_per_line == 40
+        assert generator.timing_weight == 'words'
 
     def test_split_into_lines_short_text(self):
         """Test splitting text shorter than max_chars"""
@@ -145,6 +146,25 @@ class TestSubtitleGenerator:
         assert duration1 > 0
         assert duration1 < duration
 
+    def test_calculate_timings_character_weighted(self):
+        """Test that timing_weight: chars distributes time by line length"""
+        config = {'subtitles': {'max_chars_per_line': 12, 'timing_weight': 'chars'}}
+        generator = SubtitleGenerator(config)
+
+        # Lines "a b c d e" (9 characters) and "extraordinary" (13 characters)
+        timings = generator.calculate_timings("a b c d e extraordinary", 4.4)
+
+        assert [text for _, _, text in timings] == ["a b c d e", "extraordinary"]
+        assert timings[0][0] == 0.0
+        assert timings[0][1] == pytest.approx(4.4 * 9 / 22)
+        assert timings[1][0] == pytest.approx(timings[0][1])
+        assert timings[-1][1] == pytest.approx(4.4)
+
+    def test_invalid_timing_weight_raises_error(self):
+        """Test that an unknown timing weight is rejected"""
+        with pytest.raises(ValueError, match="Unsupported subtitle timing weight"):
+            SubtitleGenerator({'subtitles': {'timing_weight': 'syllables'}})
+
     def test_calculate_timings_empty_text(self):
         """Test calculating timings for empty text"""
         config = {'subtitles': {}}
@@ -153,7 +173,7 @@ class TestSubtitleGenerator:
         timings = generator.calculate_timings("", 5.0)
         assert len(timings) == 0
 
-    def test_seconds_to_srt_time(self):
+    def test_format_srt_time(self):
         """Test conversion of seconds to SRT time format"""
         config = {'subtitles': {}}
         generator = SubtitleGenerator(config)
@@ -161,13 +181,58 @@ class TestSubtitleGenerator:
         # Test: 1 hour, 23 minutes, 45 seconds, 678 milliseconds
         total_seconds = 3600 + 23 * 60 + 45 + 0.678
 
-        srt_time = generator._seconds_to_srt_time(total_seconds)
+        srt_time = generator._format_srt_time(total_seconds)
 
-        assert srt_time.hours == 1
-        assert srt_time.minutes == 23
-        assert srt_time.seconds == 45
+        hours, minutes, rest = srt_time.split(':')
+        seconds, milliseconds = rest.split(',')
+        assert hours == '01'
+        assert minutes == '23'
+        assert seconds == '45'
         # Allow for rounding errors in float conversion
-        assert srt_time.milliseconds == pytest.approx(678, abs=2)
+        assert int(milliseconds) == pytest.approx(678, abs=2)
+
+    def test_format_srt_time_rounds_to_nearest_millisecond(self):
+        """Test that float error does not truncate timestamps down a millisecond"""
+        config = {'subtitles': {}}
+        generator = SubtitleGenerator(config)
+
+        assert generator._format_srt_time(2.9999999) == "00:00:03,000"
+        assert generator._format_srt_time(7 * (1.1 / 7) * 3) == "00:00:03,300"
+        assert generator._format_srt_time(3599.9996) == "01:00:00,000"
+
+    @pytest.mark.parametrize("timing_weight", ["words", "chars"])
+    def test_generate_srt_text_matches_timings(self, timing_weight, tmp_path):
+        """Test that the one-pass SRT builder writes calculate_timings' entries"""
+        config = {'subtitles': {'max_chars_per_line': 12, 'timing_weight': timing_weight}}
+        generator = SubtitleGenerator(config)
+
+        text = "Привет мир! Hello world! 你好世界! and a few more words"
+        srt_file = tmp_path / "test.srt"
+        srt_file.write_text(generator._generate_srt_text(text, 7.3), encoding='utf-8')
+
+        parsed = parse_srt(str(srt_file))
+        timings = generator.calculate_timings(text, 7.3)
+
+        assert [entry[2] for entry in parsed] == [entry[2] for entry in timings]
+        for (start, end, _), (expected_start, expected_end, _) in zip(parsed, timings):
+            assert start == pytest.approx(expected_start, abs=0.0005)
+            assert end == pytest.approx(expected_end, abs=0.0005)
+        assert generator._generate_srt_text("", 1.0) == ""
+
+    def test_srt_file_matches_pysrt_layout(self, tmp_path):
+        """Test that written SRT text matches the layout pysrt produces"""
+        config = {'subtitles': {'max_chars_per_line': 10}}
+        generator = SubtitleGenerator(config)
+
+        scene = Scene(id=1, text="hello there my friend ok", duration=3.3)
+        output_path = Path(generator.generate(scene, str(tmp_path)))
+
+        subs = pysrt.open(str(output_path), encoding='utf-8')
+        expected = tmp_path / "expected.srt"
+        subs.save(str(expected), encoding='utf-8')
+
+        assert output_path.read_bytes() == expected.read_bytes()
+        assert [sub.text for sub in subs] == ["hello", "there my", "friend ok"]
 
     def test_generate_creates_srt_file(self, tmp_path):
         """Test that generate creates a valid SRT file"""
@@ -296,6 +361,26 @@ class TestSubtitleGenerator:
             assert os.path.exists(scene.subtitle_path)
             assert scene.subtitle_path.endswith('.srt')
 
+    def test_batch_generate_creates_output_directory_once(self, tmp_path, monkeypatch):
+        """Test that batch generation checks the output directory once, not per scene"""
+        config = {'subtitles': {}}
+        generator = SubtitleGenerator(config)
+
+        calls = []
+        makedirs = os.makedirs
+        monkeypatch.setattr(
+            os, 'makedirs',
+            lambda path, exist_ok=False: calls.append(path) or makedirs(path, exist_ok=exist_ok)
+        )
+
+        scenes = [Scene(id=i, text=f"Scene {i}", duration=1.0) for i in range(1, 6)]
+        output_dir = tmp_path / "subtitles"
+
+        generator.batch_generate(scenes, str(output_dir))
+
+        assert calls == [str(output_dir)]
+        assert all(os.path.exists(scene.subtitle_path) for scene in scenes)
+
     def test_batch_generate_skips_scenes_without_duration(self, tmp_path):
         """Test that batch_generate skips scenes with no duration"""
         config = {'subtitles': {}}
@@ -343,3 +428,98 @@ class TestSubtitleGenerator:
         # Check that Unicode characters are preserved
         assert "Привет" in all_text or "мир" in all_text
         assert "Hello" in all_text
+
+    def test_generate_srt_text(self):
+        """Test building SRT text without touching disk"""
+        config = {'subtitles': {'max_chars_per_line': 5}}
+        generator = SubtitleGenerator(config)
+
+        srt_text = generator._generate_srt_text("Hello world", 3.0)
+
+        assert srt_text == (
+            "1\n00:00:00,000 --> 00:00:01,500\nHello\n\n"
+            "2\n00:00:01,500 --> 00:00:03,000\nworld\n\n"
+        )
+
+    def test_batch_generate_keeps_scene_paths_in_order(self, tmp_path):
+        """Test that concurrent batch generation assigns each scene its own file"""
+        config = {'subtitles': {}}
+        generator = SubtitleGenerator(config)
+
+        scenes = [Scene(id=i, text=f"Scene number {i}", duration=1.0) for i in range(1, 21)]
+        output_dir = tmp_path / "subtitles"
+
+        generator.batch_generate(scenes, str(output_dir))
+
+        for scene in scenes:
+            assert scene.subtitle_path.endswith(f"scene_{scene.id:03d}_subtitle.srt")
+            subs = pysrt.open(scene.subtitle_path, encoding='utf-8')
+            assert subs[0].text == f"Scene number {scene.id}"
+
+    def test_batch_generate_propagates_errors(self, tmp_path, monkeypatch):
+        """Test that a failing scene aborts the batch with its error"""
+        config = {'subtitles': {}}
+        generator = SubtitleGenerator(config)
+
+        def fail(text, duration):
+            raise OSError("disk full")
+
+        monkeypatch.setattr(generator, '_generate_srt_text', fail)
+        scenes = [Scene(id=1, text="Scene", duration=1.0)]
+
+        with pytest.raises(RuntimeError, match="disk full"):
+            generator.batch_generate(scenes, str(tmp_path / "subtitles"))
+
+
+class TestParseSrt:
+    """Tests for parse_srt function"""
+
+    def test_parse_srt_round_trip(self, tmp_path):
+        """Test that parsing a generated file returns its timings"""
+        config = {'subtitles': {'max_chars_per_line': 10}}
+        generator = SubtitleGenerator(config)
+
+        timings = generator.calculate_timings("hello there my friend ok", 3.3)
+        scene = Scene(id=1, text="hello there my friend ok", duration=3.3)
+        output_path = generator.generate(scene, str(tmp_path))
+
+        parsed = parse_srt(output_path)
+
+        assert [text for _, _, text in parsed] == [text for _, _, text in timings]
+        for (start, end, _), (expected_start, expected_end, _) in zip(parsed, timings):
+            assert start == pytest.approx(expected_start, abs=0.001)
+            assert end == pytest.approx(expected_end, abs=0.001)
+
+    def test_parse_srt_multiline_entries(self, tmp_path):
+        """Test parsing entries with several text lines and CRLF line endings"""
+        srt_file = tmp_path / "multi.srt"
+        srt_file.write_bytes(
+            "1\r\n00:00:00,000 --> 00:00:01,500\r\nПривет\r\nмир\r\n\r\n"
+            "2\r\n01:02:03,004 --> 01:02:05,000\r\nLast".encode('utf-8')
+        )
+
+        assert parse_srt(str(srt_file)) == [
+            (0.0, 1.5, "Привет\nмир"),
+            (3723.004, 3725.0, "Last"),
+        ]
+
+    def test_parse_srt_matches_pysrt(self, tmp_path):
+        """Test that parsed entries agree with pysrt"""
+        config = {'subtitles': {'max_chars_per_line': 15}}
+        generator = SubtitleGenerator(config)
+
+        scene = Scene(id=1, text="Привет мир! Hello world! 你好世界! One more line", duration=4.2)
+        subtitle_path = generator.generate(scene, str(tmp_path))
+
+        subs = pysrt.open(subtitle_path, encoding='utf-8')
+        parsed = parse_srt(subtitle_path)
+
+        assert [text for _, _, text in parsed] == [sub.text for sub in subs]
+        assert [start for start, _, _ in parsed] == pytest.approx(
+            [sub.start.ordinal / 1000.0 for sub in subs]
+        )
+
+    def test_parse_srt_missing_file(self, tmp_path):
+        """Test parsing a file that doesn't exist"""
+        with pytest.raises(FileNotFoundError):
+            parse_srt(str(tmp_path / "missing.srt"))
@@ -5,11 +5,37 @@ Tests for TTS Generator Module
 import pytest
 import os
 import wave
+import sys
+import types
 from pathlib import Path
 from modules.scene_parser import Scene
 from modules.tts_generator import TTSGenerator
 
 
+@pytest.fixture
+def fake_tts(monkeypatch):
+    """Install a stub TTS.api module that counts model loads"""
+    loads = []
+
+    class FakeTTS:
+        def __init__(self, model_name=None):
+            loads.append(model_name)
+
+        def to(self, device):
+            return self
+
+    api = types.ModuleType('TTS.api')
+    api.TTS = FakeTTS
+    package = types.ModuleType('TTS')
+    package.api = api
+    monkeypatch.setitem(sys.modules, 'TTS', package)
+    monkeypatch.setitem(sys.modules, 'TTS.api', api)
+
+    TTSGenerator.clear_cache()
+    yield loads
+    TTSGenerator.clear_cache()
+
+
 class TestTTSGenerator:
     """Tests for TTSGenerator class"""
 
@@ -52,12 +78,356 @@ class TestTTSGenerator:
         assert generator.language == 'en'
         assert generator.model_name == 'tts_models/en/ljspeech/vits'
 
+    def test_synthesis_kwargs(self):
+        """Test that only multilingual models receive the language argument"""
+        ru_generator = TTSGenerator({'tts': {'language': 'ru'}})
+        assert ru_generator._synthesis_kwargs == {'language': 'ru'}
+
+        en_generator = TTSGenerator({'tts': {'language': 'en'}})
+        assert en_generator._synthesis_kwargs == {}
+
     def test_lazy_loading(self):
         """Test that TTS model is not loaded on initialization"""
         config = {'tts': {'language': 'ru'}}
         generator = TTSGenerator(config)
         assert generator.tts is None
 
+    def test_workers_default(self):
+        """Test that batch generation is sequential by default"""
+        config = {'tts': {}}
+        generator = TTSGenerator(config)
+        assert generator.workers == 1
+
+    def test_workers_auto_capped_on_cpu(self, monkeypatch):
+        """Test that 'auto' does not start one model copy per CPU core"""
+        monkeypatch.setattr(os, 'cpu_count', lambda: 16)
+        config = {'tts': {'workers': 'auto', 'device': 'cpu'}}
+        generator = TTSGenerator(config)
+        assert generator._resolve_workers() == 2
+
+        monkeypatch.setattr(os, 'cpu_count', lambda: 1)
+        assert generator._resolve_workers() == 1
+
+    def test_workers_auto_one_per_gpu(self, monkeypatch):
+        """Test that 'auto' starts one worker per GPU on CUDA"""
+        fake_torch = types.SimpleNamespace(
+            cuda=types.SimpleNamespace(device_count=lambda: 3)
+        )
+        monkeypatch.setitem(sys.modules, 'torch', fake_torch)
+        config = {'tts': {'workers': 'auto', 'device': 'cuda'}}
+        assert TTSGenerator(config)._resolve_workers() == 3
+
+    def test_workers_explicit(self):
+        """Test that a numeric workers setting is used as is"""
+        config = {'tts': {'workers': 4}}
+        assert TTSGenerator(config)._resolve_workers() == 4
+
+    def test_device_default_auto(self):
+        """Test that the inference device is resolved automatically by default"""
+        config = {'tts': {}}
+        generator = TTSGenerator(config)
+        assert generator.device == 'auto'
+
+    def test_resolve_explicit_device(self):
+        """Test that an explicit device is used as-is"""
+        config = {'tts': {'device': 'cuda'}}
+        generator = TTSGenerator(config)
+        assert generator._resolve_device() == 'cuda'
+
+    def test_resolve_auto_device_without_torch(self, monkeypatch):
+        """Test that auto falls back to CPU when torch is unavailable"""
+        import sys
+        monkeypatch.setitem(sys.modules, 'torch', None)
+
+        config = {'tts': {'device': 'auto'}}
+        generator = TTSGenerator(config)
+        assert generator._resolve_device() == 'cpu'
+
+    def test_precision_default(self):
+        """Test that full precision is used by default"""
+        config = {'tts': {}}
+        generator = TTSGenerator(config)
+        assert generator.precision == 'fp32'
+
+    def test_invalid_precision_raises_error(self):
+        """Test that unknown precision values are rejected"""
+        config = {'tts': {'precision': 'fp8'}}
+
+        with pytest.raises(ValueError, match="Unsupported TTS precision"):
+            TTSGenerator(config)
+
+    def test_fp16_ignored_on_cpu(self):
+        """Test that fp16 autocast is only used on GPU"""
+        import contextlib
+        config = {'tts': {'precision': 'fp16'}}
+        generator = TTSGenerator(config)
+        generator._device = 'cpu'
+
+        assert isinstance(generator._inference_context(), contextlib.nullcontext)
+
+    @pytest.mark.parametrize("bf16_supported", [True, False])
+    def test_bf16_on_gpu(self, monkeypatch, bf16_supported):
+        """Test that bf16 casts weights and autocasts only where GPU supports it"""
+        import contextlib
+
+        fake_torch = types.SimpleNamespace(
+            bfloat16='bfloat16',
+            float16='float16',
+            cuda=types.SimpleNamespace(is_bf16_supported=lambda: bf16_supported),
+            autocast=lambda device_type, dtype: ('autocast', device_type, dtype)
+        )
+        monkeypatch.setitem(sys.modules, 'torch', fake_torch)
+
+        class FakeModel:
+            dtype = 'float32'
+
+            def to(self, dtype):
+                self.dtype = dtype
+                return self
+
+        tts = types.SimpleNamespace(synthesizer=types.SimpleNamespace(tts_model=FakeModel()))
+
+        config = {'tts': {'precision': 'bf16'}}
+        generator = TTSGenerator(config)
+        generator._apply_precision(tts, 'cuda')
+        generator._device = 'cuda'
+
+        if bf16_supported:
+            assert tts.synthesizer.tts_model.dtype == 'bfloat16'
+            assert generator._inference_context() == ('autocast', 'cuda', 'bfloat16')
+        else:
+            assert tts.synthesizer.tts_model.dtype == 'float32'
+            assert isinstance(generator._inference_context(), contextlib.nullcontext)
+
+    def test_bf16_ignored_on_cpu(self):
+        """Test that bf16 leaves CPU inference in full precision"""
+        import contextlib
+        config = {'tts': {'precision': 'bf16'}}
+        generator = TTSGenerator(config)
+        generator._device = 'cpu'
+
+        assert isinstance(generator._inference_context(), contextlib.nullcontext)
+
+    def test_compile_default_disabled(self):
+        """Test that torch.compile is off by default"""
+        config = {'tts': {}}
+        generator = TTSGenerator(config)
+        assert generator.compile is False
+
+    @pytest.mark.parametrize("language, compiled", [('ru', True), ('en', False)])
+    def test_compile_xtts_decoder(self, monkeypatch, language, compiled):
+        """Test that only the XTTS GPT decoder is wrapped with torch.compile"""
+        compile_calls = []
+        fake_torch = types.SimpleNamespace(
+            compile=lambda module, mode, dynamic: compile_calls.append((module, mode, dynamic)) or 'compiled'
+        )
+        monkeypatch.setitem(sys.modules, 'torch', fake_torch)
+
+        tts = types.SimpleNamespace(
+            synthesizer=types.SimpleNamespace(tts_model=types.SimpleNamespace(gpt='gpt'))
+        )
+
+        config = {'tts': {'language': language, 'compile': True}}
+        generator = TTSGenerator(config)
+        generator._compile_model(tts)
+
+        if compiled:
+            assert compile_calls == [('gpt', 'reduce-overhead', True)]
+            assert tts.synthesizer.tts_model.gpt == 'compiled'
+        else:
+            assert compile_calls == []
+            assert tts.synthesizer.tts_model.gpt == 'gpt'
+
+    def test_batch_generate_sequential(self, tmp_path):
+        """Test sequential batch generation updates scenes"""
+        config = {'tts': {'language': 'ru', 'workers': 1}}
+        generator = TTSGenerator(config)
+
+        def fake_generate(scene, output_dir, _ensure_dir=True):
+            # The batch creates output_dir once and skips the per-scene check
+            assert _ensure_dir is False
+            path = os.path.join(output_dir, f"scene_{scene.id:03d}_audio.wav")
+            with wave.open(path, 'w') as wav_file:
+                wav_file.setnchannels(1)
+                wav_file.setsampwidth(2)
+                wav_file.setframerate(16000)
+                wav_file.writeframes(b'\x00\x00' * 8000 * scene.id)
+            return path
+
+        generator.generate = fake_generate
+
+        scenes = [Scene(id=1, text="One"), Scene(id=2, text="Two")]
+        generator.batch_generate(scenes, str(tmp_path))
+
+        assert scenes[0].duration == pytest.approx(0.5, abs=0.01)
+        assert scenes[1].duration == pytest.approx(1.0, abs=0.01)
+        assert all(os.path.exists(scene.audio_path) for scene in scenes)
+
+    def test_worker_devices_round_robin_over_gpus(self, monkeypatch):
+        """Test that batch workers are spread across available GPUs"""
+        fake_torch = types.SimpleNamespace(
+            cuda=types.SimpleNamespace(device_count=lambda: 2)
+        )
+        monkeypatch.setitem(sys.modules, 'torch', fake_torch)
+        generator = TTSGenerator({'tts': {'device': 'cuda'}})
+
+        assert generator._worker_devices(3) == ['cuda:0', 'cuda:1', 'cuda:0']
+
+    def test_worker_devices_single_device(self, monkeypatch):
+        """Test that workers are not pinned without multiple GPUs"""
+        fake_torch = types.SimpleNamespace(
+            cuda=types.SimpleNamespace(device_count=lambda: 1)
+        )
+        monkeypatch.setitem(sys.modules, 'torch', fake_torch)
+
+        assert TTSGenerator({'tts': {'device': 'cuda'}})._worker_devices(2) is None
+        assert TTSGenerator({'tts': {'device': 'cpu'}})._worker_devices(2) is None
+
+    def test_init_worker_takes_device_from_queue(self, fake_tts):
+        """Test that a worker process loads the model on its assigned GPU"""
+        import queue
+        import modules.tts_generator as tts_generator
+
+        devices = queue.Queue()
+        devices.put('cuda:1')
+        config = {'tts': {'language': 'ru', 'device': 'cuda'}}
+
+        tts_generator._init_worker(config, devices)
+
+        assert tts_generator._worker_generator._device == 'cuda:1'
+        assert config['tts']['device'] == 'cuda'
+        tts_generator._worker_generator = None
+
+    def test_model_shared_between_generators(self, fake_tts):
+        """Test that generators with the same model reuse one loaded instance"""
+        config = {'tts': {'language': 'ru', 'device': 'cpu'}}
+
+        first = TTSGenerator.preload(config)
+        second = TTSGenerator(config)
+        second._initialize_tts()
+
+        assert first.tts is second.tts
+        assert len(fake_tts) == 1
+
+    def test_prewarm_loads_model_in_background(self, fake_tts):
+        """Test that prewarm loads the model once and generate reuses it"""
+        import threading
+
+        started = threading.Event()
+        release = threading.Event()
+        FakeTTS = sys.modules['TTS.api'].TTS
+        original_init = FakeTTS.__init__
+
+        def slow_init(self, model_name=None):
+            started.set()
+            release.wait(5)
+            original_init(self, model_name)
+
+        FakeTTS.__init__ = slow_init
+        generator = TTSGenerator({'tts': {'language': 'ru', 'device': 'cpu'}})
+
+        thread = generator.prewarm()
+        assert started.wait(5)
+        assert generator.tts is None
+
+        # A synchronous initialization joins the running load
+        waiter = threading.Thread(target=generator._initialize_tts)
+        waiter.start()
+        release.set()
+        waiter.join(5)
+        thread.join(5)
+
+        assert generator.tts is not None
+        assert len(fake_tts) == 1
+
+    def test_prewarm_failure_retried_on_use(self, monkeypatch):
+        """Test that a failed background load is surfaced by the next call"""
+        monkeypatch.setitem(sys.modules, 'TTS', None)
+        monkeypatch.setitem(sys.modules, 'TTS.api', None)
+        generator = TTSGenerator({'tts': {'language': 'ru', 'device': 'cpu'}})
+
+        generator.prewarm().join(5)
+
+        assert generator.tts is None
+        with pytest.raises(ImportError, match="pip install TTS"):
+            generator._initialize_tts()
+
+    def test_clear_cache_forces_reload(self, fake_tts):
+        """Test that clearing the cache loads the model again"""
+        config = {'tts': {'language': 'ru', 'device': 'cpu'}}
+
+        TTSGenerator.preload(config)
+        TTSGenerator.clear_cache()
+        TTSGenerator.preload(config)
+
+        assert len(fake_tts) == 2
+
+    def test_speaker_wav_passed_to_non_xtts_models(self):
+        """Test that voice-cloning models other than XTTS get speaker_wav per call"""
+        config = {'tts': {'language': 'en', 'speaker_wav': 'voice.wav'}}
+        generator = TTSGenerator(config)
+
+        assert generator._synthesis_kwargs == {'speaker_wav': 'voice.wav'}
+
+    def test_xtts_speaker_latents_computed_once(self, fake_tts, tmp_path):
+        """Test that XTTS speaker conditioning is encoded once and reused"""
+        import numpy as np
+        conditioning_calls = []
+        inference_calls = []
+
+        class FakeXTTSModel:
+            def get_conditioning_latents(self, audio_path):
+                conditioning_calls.append(audio_path)
+                return 'gpt_latent', 'speaker_embedding'
+
+            def inference(self, text, language, gpt_cond_latent, speaker_embedding, speed=1.0,
+                          enable_text_splitting=False):
+                inference_calls.append(
+                    (text, language, gpt_cond_latent, speaker_embedding, enable_text_splitting)
+                )
+                return {'wav': np.zeros(2400, dtype=np.float32)}
+
+        FakeTTS = sys.modules['TTS.api'].TTS
+        FakeTTS.synthesizer = types.SimpleNamespace(
+            tts_model=FakeXTTSModel(),
+            output_sample_rate=24000
+        )
+
+        config = {'tts': {'language': 'ru', 'device': 'cpu', 'speaker_wav': 'voice.wav'}}
+        generator = TTSGenerator(config)
+
+        first = generator.generate(Scene(id=1, text="One"), str(tmp_path))
+        generator.generate(Scene(id=2, text="Two"), str(tmp_path))
+
+        assert conditioning_calls == [['voice.wav']]
+        assert inference_calls == [
+            ("One", 'ru', 'gpt_latent', 'speaker_embedding', True),
+            ("Two", 'ru', 'gpt_latent', 'speaker_embedding', True),
+        ]
+        assert generator.get_audio_duration(first) == pytest.approx(0.1)
+
+    def test_generate_sets_duration_from_waveform(self, fake_tts, tmp_path):
+        """Test that generate measures duration in memory and writes via the synthesizer"""
+        saved = []
+
+        def save_wav(wav, path):
+            saved.append(path)
+            Path(path).write_bytes(b'')
+
+        FakeTTS = sys.modules['TTS.api'].TTS
+        FakeTTS.tts = lambda self, text, **kwargs: [0.0] * 11025
+        FakeTTS.synthesizer = types.SimpleNamespace(save_wav=save_wav, output_sample_rate=22050)
+
+        config = {'tts': {'language': 'en', 'device': 'cpu'}}
+        generator = TTSGenerator(config)
+        generator.get_audio_duration = lambda path: pytest.fail("audio file read back")
+
+        scene = Scene(id=1, text="Hello")
+        generator.batch_generate([scene], str(tmp_path))
+
+        assert scene.duration == pytest.approx(0.5)
+        assert saved == [scene.audio_path]
+
     def test_get_audio_duration_file_not_found(self):
         """Test getting duration of non-existent file"""
         config = {'tts': {'language': 'ru'}}
@@ -84,6 +454,113 @@ class TestTTSGenerator:
         duration = generator.get_audio_duration(str(wav_path))
         assert duration == pytest.approx(1.0, abs=0.01)
 
+    def test_parse_canonical_wav_header(self, tmp_path):
+        """Test that the header fast path reads wave-module output"""
+        wav_path = tmp_path / "test.wav"
+
+        with wave.open(str(wav_path), 'w') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(16000)
+            wav_file.writeframes(b'\x00\x00' * 24000)
+
+        header = wav_path.read_bytes()[:44]
+        assert TTSGenerator._parse_wav_header(header) == pytest.approx(1.5)
+
+    def test_get_audio_duration_non_canonical_header(self, tmp_path):
+        """Test duration of a WAV with an extra chunk before the data"""
+        wav_path = tmp_path / "test.wav"
+
+        with wave.open(str(wav_path), 'w') as wav_file:
+            wav_file.setnchannels(2)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(8000)
+            wav_file.writeframes(b'\x00\x00' * 2 * 4000)
+
+        # Insert a LIST chunk between fmt and data
+        data = wav_path.read_bytes()
+        extra = b'LIST' + (4).to_bytes(4, 'little') + b'INFO'
+        patched = data[:36] + extra + data[36:]
+        riff_size = (len(patched) - 8).to_bytes(4, 'little')
+        wav_path.write_bytes(patched[:4] + riff_size + patched[8:])
+
+        config = {'tts': {'language': 'ru'}}
+        generator = TTSGenerator(config)
+
+        assert generator._parse_wav_header(wav_path.read_bytes()[:44]) is None
+        assert generator.get_audio_duration(str(wav_path)) == pytest.approx(0.5, abs=0.01)
+
+    def test_preview_quality_default_disabled(self):
+        """Test that preview copies are off by default"""
+        generator = TTSGenerator({'tts': {'language': 'ru'}})
+        assert generator.preview_quality is False
+
+    def test_write_preview_mulaw(self, tmp_path):
+        """Test that the preview is a half-size mu-law copy with the same duration"""
+        import warnings
+        import numpy as np
+
+        samples = np.arange(-32768, 32768, 7, dtype='<i2')
+        wav_path = tmp_path / "scene_001_audio.wav"
+        with wave.open(str(wav_path), 'w') as wav_file:
+            wav_file.setnchannels(1)
+            wav_file.setsampwidth(2)
+            wav_file.setframerate(16000)
+            wav_file.writeframes(samples.tobytes())
+
+        generator = TTSGenerator({'tts': {'language': 'ru', 'preview_quality': True}})
+        preview_path = generator._write_preview(str(wav_path))
+
+        assert preview_path == str(tmp_path / "scene_001_audio_preview.wav")
+        data = Path(preview_path).read_bytes()
+        assert int.from_bytes(data[20:22], 'little') == 7
+        assert generator.get_audio_duration(preview_path) == pytest.approx(
+            generator.get_audio_duration(str(wav_path))
+        )
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            audioop = pytest.importorskip('audioop')
+        assert data[44:44 + len(samples)] == audioop.lin2ulaw(samples.tobytes(), 2)
+
+    def test_get_audio_duration_extensible_format(self, tmp_path):
+        """Test duration of a WAVE_FORMAT_EXTENSIBLE file with a data-like LIST chunk"""
+        import struct
+
+        rate, channels, sample_width = 16000, 2, 2
+        block_align = channels * sample_width
+        samples = b'\x00' * block_align * 8000
+        fmt = struct.pack(
+            '<HHIIHHHHI16s', 0xFFFE, channels, rate, rate * block_align,
+            block_align, 16, 22, 16, 3, b'\x01\x00' + b'\x00' * 14
+        )
+        # A LIST chunk whose payload contains b'data' must not be mistaken
+        # for the data chunk
+        info = b'INFOdata' + b'\x00'
+        body = (
+            b'WAVE'
+            + b'fmt ' + struct.pack('<I', len(fmt)) + fmt
+            + b'LIST' + struct.pack('<I', len(info)) + info + b'\x00'
+            + b'data' + struct.pack('<I', len(samples)) + samples
+        )
+        wav_path = tmp_path / "extensible.wav"
+        wav_path.write_bytes(b'RIFF' + struct.pack('<I', len(body)) + body)
+
+        generator = TTSGenerator({'tts': {'language': 'ru'}})
+
+        assert generator._parse_wav_header(wav_path.read_bytes()[:44]) is None
+        assert generator.get_audio_duration(str(wav_path)) == pytest.approx(0.5)
+
+    def test_get_audio_duration_not_a_wav(self, tmp_path):
+        """Test that a non-RIFF file raises RuntimeError"""
+        bad_path = tmp_path / "bad.wav"
+        bad_path.write_bytes(b'not a wav file at all')
+
+        generator = TTSGenerator({'tts': {'language': 'ru'}})
+
+        with pytest.raises(RuntimeError, match="Failed to read audio file"):
+            generator.get_audio_duration(str(bad_path))
+
     @pytest.mark.skipif(
         not os.path.exists('./venv/lib/python3.11/site-packages/TTS'),
         reason="TTS library not installed"
@@ -4,44 +4,55 @@ Tests for Visual Selector Module
 
 import pytest
 import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import numpy as np
 from PIL import Image
 from modules.scene_parser import Scene
 from modules.visual_selector import VisualSelector
 
 
-@pytest.fixture
-def create_test_images(tmp_path):
-    """Create test images with different aspect ratios"""
-    images_dir = tmp_path / "test_images"
-    images_dir.mkdir()
+@pytest.fixture(scope="session")
+def create_test_images(tmp_path_factory):
+    """
+    Create test images with different aspect ratios
+
+    Created once per session; tests that modify the directory must use
+    copy_test_images instead
+    """
+    images_dir = tmp_path_factory.mktemp("test_images")
+
+    images = [
+        # Horizontal image (landscape) 1600x900
+        ('horizontal', Image.new('RGB', (1600, 900), color='blue'), images_dir / "horizontal.jpg"),
+        # Vertical image (portrait) 900x1600
+        ('vertical', Image.new('RGB', (900, 1600), color='red'), images_dir / "vertical.jpg"),
+        # Square image 1000x1000
+        ('square', Image.new('RGB', (1000, 1000), color='green'), images_dir / "square.jpg"),
+        # PNG image
+        ('png', Image.new('RGB', (800, 600), color='yellow'), images_dir / "test.png"),
+    ]
 
-    # Create horizontal image (landscape) 1600x900
-    horizontal_img = Image.new('RGB', (1600, 900), color='blue')
-    horizontal_path = images_dir / "horizontal.jpg"
-    horizontal_img.save(horizontal_path)
+    # Pillow releases the GIL while encoding, so the files are written in parallel
+    with ThreadPoolExecutor(max_workers=len(images)) as executor:
+        list(executor.map(lambda image: image[1].save(image[2]), images))
 
-    # Create vertical image (portrait) 900x1600
-    vertical_img = Image.new('RGB', (900, 1600), color='red')
-    vertical_path = images_dir / "vertical.jpg"
-    vertical_img.save(vertical_path)
+    paths = {'dir': str(images_dir)}
+    paths.update((key, str(path)) for key, _, path in images)
 
-    # Create square image 1000x1000
-    square_img = Image.new('RGB', (1000, 1000), color='green')
-    square_path = images_dir / "square.jpg"
-    square_img.save(square_path)
+    return paths
 
-    # Create PNG image
-    png_img = Image.new('RGB', (800, 600), color='yellow')
-    png_path = images_dir / "test.png"
-    png_img.save(png_path)
+
+@pytest.fixture
+def copy_test_images(create_test_images, tmp_path):
+    """Private copy of the test images for tests that modify them"""
+    images_dir = tmp_path / "test_images"
+    shutil.copytree(create_test_images['dir'], images_dir)
 
     return {
-        'dir': str(images_dir),
-        'horizontal': str(horizontal_path),
-        'vertical': str(vertical_path),
-        'square': str(square_path),
-        'png': str(png_path)
+        key: str(images_dir / os.path.basename(path)) if key != 'dir' else str(images_dir)
+        for key, path in create_test_images.items()
     }
 
 
@@ -77,6 +88,7 @@ class TestVisualSelector:
         assert selector.default_duration == 5
         assert selector.target_width == 1920
         assert selector.target_height == 1080
+        assert selector.cache_dir is None
 
     def test_get_image_files(self, create_test_images):
         """Test getting list of image files"""
@@ -89,6 +101,47 @@ class TestVisualSelector:
         # Should be sorted
         assert all('.jpg' in f or '.png' in f for f in image_files)
 
+    def test_get_image_files_skips_directories_and_other_files(self, tmp_path):
+        """Test that only image files are listed, regardless of extension case"""
+        (tmp_path / "photo.JPG").write_bytes(b"")
+        (tmp_path / "notes.txt").write_bytes(b"")
+        (tmp_path / "photo.jpg.txt").write_bytes(b"")
+        (tmp_path / "png").write_bytes(b"")
+        (tmp_path / "folder.png").mkdir()
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        image_files = selector._get_image_files(str(tmp_path))
+
+        assert image_files == [str(tmp_path / "photo.JPG")]
+
+    def test_get_image_files_cached_until_directory_changes(self, copy_test_images, monkeypatch):
+        """Test that repeated listings reuse the scan until the directory changes"""
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+        directory = copy_test_images['dir']
+
+        first = selector._get_image_files(directory)
+
+        scans = []
+        real_scandir = os.scandir
+        monkeypatch.setattr(os, 'scandir', lambda path: scans.append(path) or real_scandir(path))
+
+        assert selector._get_image_files(directory) == first
+        assert scans == []
+
+        # A new file changes the directory mtime and invalidates the listing
+        new_image = os.path.join(directory, "zzz_new.png")
+        Image.new('RGB', (10, 10)).save(new_image)
+        stat = os.stat(directory)
+        os.utime(directory, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+        assert selector._get_image_files(directory) == first + [new_image]
+        assert len(scans) == 1
+        # The stale listing is replaced rather than kept alongside
+        assert len(selector._dir_cache) == 1
+
     def test_get_image_files_empty_directory(self, tmp_path):
         """Test getting image files from empty directory"""
         empty_dir = tmp_path / "empty"
@@ -236,6 +289,120 @@ class TestVisualSelector:
         # Should contain dimensions in filename
         assert "horizontal_scaled_1920x1080" in scaled_path
 
+    def test_scale_image_reuses_cached_result(self, create_test_images, tmp_path):
+        """Test that scaling an unchanged source again returns the cached file"""
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        output_dir = tmp_path / "scaled"
+        first_path = selector.scale_image(create_test_images['horizontal'], output_dir=str(output_dir))
+        first_mtime = os.stat(first_path).st_mtime_ns
+
+        second_path = selector.scale_image(create_test_images['horizontal'], output_dir=str(output_dir))
+
+        assert second_path == first_path
+        assert os.stat(second_path).st_mtime_ns == first_mtime
+        # No temporary files left behind
+        assert os.listdir(output_dir) == [os.path.basename(first_path)]
+
+    def test_scale_image_cache_invalidated_on_change(self, copy_test_images, tmp_path):
+        """Test that modifying the source produces a new scaled file"""
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        output_dir = tmp_path / "scaled"
+        first_path = selector.scale_image(copy_test_images['png'], output_dir=str(output_dir))
+
+        Image.new('RGB', (640, 480), color='purple').save(copy_test_images['png'])
+        os.utime(copy_test_images['png'], ns=(0, os.stat(first_path).st_mtime_ns + 10**9))
+
+        second_path = selector.scale_image(copy_test_images['png'], output_dir=str(output_dir))
+
+        assert second_path != first_path
+        with Image.open(second_path) as img:
+            assert img.getpixel((960, 540)) == (128, 0, 128)
+
+    def test_scale_image_shared_cache_dir(self, create_test_images, tmp_path, monkeypatch):
+        """Test that paths.cache_dir serves new output directories without rescaling"""
+        config = {'visuals': {}, 'video': {}, 'paths': {'cache_dir': str(tmp_path / "cache")}}
+        selector = VisualSelector(config)
+
+        calls = []
+        scale = selector._scale_with_pillow
+        monkeypatch.setattr(
+            selector, '_scale_with_pillow',
+            lambda *args: calls.append(args[0]) or scale(*args)
+        )
+
+        first_path = selector.scale_image(create_test_images['horizontal'], output_dir=str(tmp_path / "run1"))
+        second_path = selector.scale_image(create_test_images['horizontal'], output_dir=str(tmp_path / "run2"))
+
+        assert len(calls) == 1
+        assert os.path.dirname(first_path) == str(tmp_path / "run1")
+        assert os.path.dirname(second_path) == str(tmp_path / "run2")
+        assert Path(first_path).read_bytes() == Path(second_path).read_bytes()
+        assert os.listdir(tmp_path / "cache" / "images") == [os.path.basename(first_path)]
+
+    def test_scale_image_cache_dir_evicts_least_recently_used(self, create_test_images, tmp_path):
+        """Test that the shared cache is trimmed to its size bound, oldest first"""
+        config = {'visuals': {}, 'video': {}, 'paths': {'cache_dir': str(tmp_path / "cache")}}
+        selector = VisualSelector(config)
+        cache_images = tmp_path / "cache" / "images"
+
+        assert selector.cache_max_bytes == 1024 * 1024 * 1024
+
+        first_path = selector.scale_image(
+            create_test_images['horizontal'], (320, 180), output_dir=str(tmp_path / "run")
+        )
+        first_cached = cache_images / os.path.basename(first_path)
+        stat = first_cached.stat()
+        os.utime(first_cached, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**9))
+
+        selector.cache_max_bytes = stat.st_size + 1
+        selector.scale_image(create_test_images['vertical'], (320, 180), output_dir=str(tmp_path / "run"))
+
+        assert not first_cached.exists()
+        # Published outputs survive eviction of their cache entry
+        with Image.open(first_path) as img:
+            assert img.size == (320, 180)
+
+    def test_scale_image_cache_dir_unbounded(self, tmp_path):
+        """Test that cache_max_size_mb: 0 disables eviction"""
+        config = {'visuals': {}, 'video': {}, 'paths': {'cache_dir': str(tmp_path), 'cache_max_size_mb': 0}}
+        selector = VisualSelector(config)
+
+        assert selector.cache_max_bytes is None
+
+    def test_scale_image_cache_dir_copies_without_hard_links(self, create_test_images, tmp_path, monkeypatch):
+        """Test that cached images are copied when hard links are unavailable"""
+        config = {'visuals': {}, 'video': {}, 'paths': {'cache_dir': str(tmp_path / "cache")}}
+        selector = VisualSelector(config)
+
+        def no_link(src, dst):
+            raise OSError("cross-device link")
+
+        monkeypatch.setattr(os, 'link', no_link)
+
+        output_dir = tmp_path / "scaled"
+        output_path = selector.scale_image(create_test_images['png'], output_dir=str(output_dir))
+
+        with Image.open(output_path) as img:
+            assert img.size == (1920, 1080)
+        assert os.listdir(output_dir) == [os.path.basename(output_path)]
+
+    def test_jpeg_quality_setting(self, create_test_images, tmp_path):
+        """Test that jpeg_quality defaults to 85 and is part of the cache key"""
+        default = VisualSelector({'visuals': {}, 'video': {}})
+        custom = VisualSelector({'visuals': {'jpeg_quality': 60}, 'video': {}})
+        assert default.jpeg_quality == 85
+
+        output_dir = str(tmp_path / "scaled")
+        default_path = default.scale_image(create_test_images['horizontal'], (640, 360), output_dir)
+        custom_path = custom.scale_image(create_test_images['horizontal'], (640, 360), output_dir)
+
+        assert custom_path != default_path
+        assert os.path.getsize(custom_path) < os.path.getsize(default_path)
+
     def test_scale_image_different_resolutions(self, create_test_images, tmp_path):
         """Test scaling to different target resolutions"""
         config = {'visuals': {}, 'video': {}}
@@ -299,6 +466,119 @@ class TestVisualSelector:
         with Image.open(scaled_path) as img:
             assert img.mode == 'RGB'
 
+    def test_resize_backend_default(self):
+        """Test that Pillow is the default resize backend"""
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+        assert selector.resize_backend == 'pillow'
+
+    @pytest.mark.parametrize("source", ['horizontal', 'vertical', 'png'])
+    def test_scale_image_vips_backend(self, create_test_images, tmp_path, source):
+        """Test crop-to-fit scaling with the libvips backend"""
+        pytest.importorskip('pyvips')
+
+        config = {'visuals': {'resize_backend': 'vips'}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            create_test_images[source],
+            target_resolution=(1920, 1080),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        with Image.open(scaled_path) as img:
+            assert img.size == (1920, 1080)
+            assert img.mode == 'RGB'
+
+    def test_scale_image_vips_strips_metadata(self, tmp_path):
+        """Test that the libvips backend drops source metadata like Pillow"""
+        pytest.importorskip('pyvips')
+
+        exif = Image.Exif()
+        exif[0x010F] = "Test Camera"  # Make
+        source = tmp_path / "with_exif.jpg"
+        Image.new('RGB', (800, 600), color='orange').save(source, exif=exif)
+
+        config = {'visuals': {'resize_backend': 'vips'}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            str(source),
+            target_resolution=(320, 180),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        with Image.open(scaled_path) as img:
+            assert img.size == (320, 180)
+            assert 'exif' not in img.info
+
+    def test_scale_image_vips_backend_bmp(self, tmp_path):
+        """Test that the vips backend scales BMP sources via Pillow"""
+        pytest.importorskip('pyvips')
+
+        source = tmp_path / "source.bmp"
+        Image.new('RGB', (800, 600), color='purple').save(source)
+
+        config = {'visuals': {'resize_backend': 'vips'}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            str(source),
+            target_resolution=(320, 180),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        assert scaled_path.endswith('.bmp')
+        with Image.open(scaled_path) as img:
+            assert img.format == 'BMP'
+            assert img.size == (320, 180)
+
+    def test_scale_image_vips_not_installed(self, create_test_images, tmp_path, monkeypatch):
+        """Test that the vips backend reports a missing pyvips install"""
+        import sys
+        monkeypatch.setitem(sys.modules, 'pyvips', None)
+
+        config = {'visuals': {'resize_backend': 'vips'}, 'video': {}}
+        selector = VisualSelector(config)
+
+        with pytest.raises(ImportError, match="pyvips library not installed"):
+            selector.scale_image(
+                create_test_images['horizontal'],
+                output_dir=str(tmp_path / "scaled")
+            )
+
+    @pytest.mark.parametrize("source", ['horizontal', 'vertical', 'square', 'png'])
+    def test_scale_image_opencv_backend(self, create_test_images, tmp_path, source):
+        """Test crop-to-fit scaling with the OpenCV backend"""
+        pytest.importorskip('cv2')
+
+        config = {'visuals': {'resize_backend': 'opencv'}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            create_test_images[source],
+            target_resolution=(1280, 720),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        with Image.open(scaled_path) as img:
+            assert img.size == (1280, 720)
+            assert img.mode == 'RGB'
+
+    def test_scale_image_opencv_not_installed(self, create_test_images, tmp_path, monkeypatch):
+        """Test that the opencv backend reports a missing OpenCV install"""
+        import sys
+        monkeypatch.setitem(sys.modules, 'cv2', None)
+
+        config = {'visuals': {'resize_backend': 'opencv'}, 'video': {}}
+        selector = VisualSelector(config)
+
+        with pytest.raises(ImportError, match="OpenCV library not installed"):
+            selector.scale_image(
+                create_test_images['horizontal'],
+                output_dir=str(tmp_path / "scaled")
+            )
+
     def test_get_image_info(self, create_test_images):
         """Test getting image information"""
         config = {'visuals': {}, 'video': {}}
@@ -312,6 +592,22 @@ class TestVisualSelector:
         assert info['mode'] == 'RGB'
         assert info['size'] > 0
 
+    def test_get_image_info_reads_header_only(self, create_test_images, monkeypatch):
+        """Test that get_image_info never decodes pixel data"""
+        def fail_load(self):
+            raise AssertionError("pixel data decoded")
+
+        monkeypatch.setattr(Image.Image, 'load', fail_load)
+        from PIL import ImageFile
+        monkeypatch.setattr(ImageFile.ImageFile, 'load', fail_load)
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+        info = selector.get_image_info(create_test_images['horizontal'])
+
+        assert (info['width'], info['height']) == (1600, 900)
+        assert info['size'] == os.path.getsize(create_test_images['horizontal'])
+
     def test_get_image_info_nonexistent(self):
         """Test getting info for nonexistent image"""
         config = {'visuals': {}, 'video': {}}
@@ -348,6 +644,28 @@ class TestVisualSelector:
                 assert img.width == 1920
                 assert img.height == 1080
 
+    def test_batch_process_reused_image(self, create_test_images, tmp_path):
+        """Test that scenes sharing a source image share one scaled file"""
+        single_dir = tmp_path / "single"
+        single_dir.mkdir()
+        Image.new('RGB', (800, 600), color='blue').save(single_dir / "only.jpg")
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scenes = [Scene(id=i, text=f"Scene {i}") for i in range(1, 5)]
+        selector.batch_process(scenes, images_dir=str(single_dir), output_dir=str(tmp_path / "out"))
+
+        assert len({scene.image_path for scene in scenes}) == 1
+        assert os.path.exists(scenes[0].image_path)
+
+    def test_batch_process_empty(self, tmp_path):
+        """Test batch processing with no scenes"""
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        selector.batch_process([], images_dir=str(tmp_path), output_dir=str(tmp_path / "out"))
+
     def test_scale_preserves_center(self, tmp_path):
         """Test that crop-to-fit preserves center of image"""
         # Create image with distinct regions
@@ -375,9 +693,187 @@ class TestVisualSelector:
         # Scaled image should be mostly white (center preserved)
         # Red and blue borders should be cropped out
         with Image.open(scaled_path) as scaled_img:
-            # Sample center pixel
-            center_pixel = scaled_img.getpixel((960, 540))
-            # Should be white or very close to white
-            assert center_pixel[0] > 200  # R
-            assert center_pixel[1] > 200  # G
-            assert center_pixel[2] > 200  # B
+            pixels = np.asarray(scaled_img)
+
+        # Center patch should be white or very close to white
+        center = pixels[535:545, 955:965].mean(axis=(0, 1))
+        assert (center > 200).all()
+
+        # No red or blue left in the outermost columns
+        for edge in (pixels[:, :4], pixels[:, -4:]):
+            assert (edge.min(axis=(0, 1)) > 200).all()
+
+    def test_scale_large_jpeg_uses_reduced_decode(self, tmp_path, monkeypatch):
+        """Test that large JPEG sources are decoded at a reduced scale"""
+        img = Image.new('RGB', (4000, 3000), color='white')
+        from PIL import ImageDraw
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([1800, 1300, 2200, 1700], fill='green')  # Center block
+
+        test_image_path = tmp_path / "large.jpg"
+        img.save(test_image_path)
+
+        from PIL import JpegImagePlugin
+        decoded_sizes = []
+        real_draft = JpegImagePlugin.JpegImageFile.draft
+
+        def recording_draft(self, mode, size):
+            result = real_draft(self, mode, size)
+            decoded_sizes.append(self.size)
+            return result
+
+        monkeypatch.setattr(JpegImagePlugin.JpegImageFile, 'draft', recording_draft)
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            str(test_image_path),
+            target_resolution=(480, 270),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        # Decoded at 1/4 scale (1000x750), still covering 2x the target
+        assert decoded_sizes == [(1000, 750)]
+        with Image.open(scaled_path) as scaled_img:
+            assert scaled_img.size == (480, 270)
+            center_pixel = scaled_img.getpixel((240, 135))
+            assert center_pixel[1] > 100 and center_pixel[0] < 50
+
+    def test_scale_matching_aspect_integer_multiple_uses_reduce(self, tmp_path, monkeypatch):
+        """Test that an exact multiple of the target is box-reduced without cropping"""
+        img = Image.new('RGB', (1280, 720), color='white')
+        from PIL import ImageDraw
+        draw = ImageDraw.Draw(img)
+        draw.rectangle([0, 0, 3, 719], fill='red')  # Thin left border
+
+        test_image_path = tmp_path / "exact.png"
+        img.save(test_image_path)
+
+        factors = []
+        real_reduce = Image.Image.reduce
+        monkeypatch.setattr(
+            Image.Image, 'reduce',
+            lambda self, factor, box=None: factors.append(factor) or real_reduce(self, factor, box)
+        )
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            str(test_image_path),
+            target_resolution=(640, 360),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        assert factors == [2]
+        with Image.open(scaled_path) as scaled_img:
+            assert scaled_img.size == (640, 360)
+            # Nothing cropped: the left border is still there
+            assert scaled_img.getpixel((0, 180)) == (255, 0, 0)
+
+    def test_scale_image_target_size_copies_source(self, tmp_path):
+        """Test that a source already at the target size is copied, not re-encoded"""
+        source = tmp_path / "exact.jpg"
+        Image.new('RGB', (640, 360), color='blue').save(source, quality=80)
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+        output_path = selector.scale_image(str(source), (640, 360), output_dir=str(tmp_path / "scaled"))
+
+        assert Path(output_path).read_bytes() == source.read_bytes()
+
+    @pytest.mark.parametrize("name, mode, exif_orientation", [
+        ("exact.png", 'RGBA', None),    # alpha must be dropped
+        ("exact.jpg", 'L', None),       # grayscale needs conversion to RGB
+        ("rotated.jpg", 'RGB', 6),      # EXIF rotation would change display
+    ])
+    def test_scale_image_target_size_reencodes_when_needed(self, tmp_path, name, mode, exif_orientation):
+        """Test that same-size sources are still re-encoded when a copy would differ"""
+        source = tmp_path / name
+        img = Image.new(mode, (640, 360), color=128)
+        save_options = {}
+        if exif_orientation is not None:
+            exif = Image.Exif()
+            exif[0x0112] = exif_orientation
+            save_options['exif'] = exif
+        img.save(source, **save_options)
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+        output_path = selector.scale_image(str(source), (640, 360), output_dir=str(tmp_path / "scaled"))
+
+        with Image.open(output_path) as scaled:
+            assert scaled.size == (640, 360)
+            assert scaled.mode == 'RGB'
+            assert scaled.getexif().get(0x0112) is None
+
+    @pytest.mark.parametrize("source_size, target, expected", [
+        ((1600, 900), (1920, 1080), (1920, 1080, 0, 0)),
+        ((2000, 1000), (1920, 1080), (2160, 1080, 120, 0)),
+        ((900, 1600), (1920, 1080), (1920, 3413, 0, 1166)),
+        ((1000, 1000), (1080, 1920), (1920, 1920, 420, 0)),
+    ])
+    def test_plan_crop(self, source_size, target, expected):
+        """Test the cover size and center-crop offset for crop-to-fit"""
+        plan = VisualSelector._plan_crop(*source_size, *target)
+
+        assert plan == expected
+        new_width, new_height, left, top = plan
+        assert left + target[0] <= new_width
+        assert top + target[1] <= new_height
+
+    def test_scale_crop_matches_resize_then_crop(self, tmp_path):
+        """Test that resizing the crop box directly equals resize-then-crop"""
+        gradient = np.linspace(0, 255, 1200, dtype=np.uint8)[None, :, None].repeat(500, axis=0).repeat(3, axis=2)
+        source = tmp_path / "gradient.png"
+        Image.fromarray(gradient).save(source)
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+        scaled_path = selector.scale_image(str(source), (320, 180), output_dir=str(tmp_path / "scaled"))
+
+        # Reference: cover-resize to 432x180, then center crop
+        with Image.open(source) as img:
+            expected = img.resize((432, 180), Image.Resampling.LANCZOS).crop((56, 0, 376, 180))
+
+        with Image.open(scaled_path) as img:
+            assert np.abs(np.asarray(img, dtype=int) - np.asarray(expected, dtype=int)).max() <= 1
+
+    def test_scale_matching_aspect_non_integer(self, tmp_path):
+        """Test that a matching aspect ratio at a non-integer scale resizes exactly"""
+        test_image_path = tmp_path / "upscale.png"
+        Image.new('RGB', (1600, 900), color='blue').save(test_image_path)
+
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            str(test_image_path),
+            target_resolution=(1920, 1080),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        with Image.open(scaled_path) as scaled_img:
+            assert scaled_img.size == (1920, 1080)
+            assert scaled_img.getpixel((960, 540)) == (0, 0, 255)
+
+    @pytest.mark.parametrize("source, expected_format", [('horizontal', 'JPEG'), ('png', 'PNG')])
+    def test_scale_image_output_encoding(self, create_test_images, tmp_path, source, expected_format):
+        """Test that scaled images keep their format with fast encoder settings"""
+        config = {'visuals': {}, 'video': {}}
+        selector = VisualSelector(config)
+
+        scaled_path = selector.scale_image(
+            create_test_images[source],
+            target_resolution=(640, 360),
+            output_dir=str(tmp_path / "scaled")
+        )
+
+        with Image.open(scaled_path) as img:
+            assert img.format == expected_format
+            assert img.size == (640, 360)
+            if expected_format == 'JPEG':
+                from PIL import JpegImagePlugin
+                assert JpegImagePlugin.get_sampling(img) == 2  # 4:2:0
+                assert 'progressive' not in img.info